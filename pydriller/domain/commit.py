@@ -18,6 +18,7 @@ Commit, Modification,
 ModificationType and Method.
 """
 import logging
+import os
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
@@ -25,8 +26,6 @@ from typing import Any, List, Set, Dict, Tuple, Optional, Union
 
 import hashlib
 
-import lizard
-import lizard_languages
 from git import Diff, Git, NULL_TREE
 from git.objects import Commit as GitCommit
 from git.objects.base import IndexObject
@@ -162,12 +161,17 @@ class ModifiedFile:
         one.
         """
         self._c_diff = diff
+        # the paths are read for every file by the process metrics:
+        # normalize them once instead of on every access
+        self._old_path = self._normalize_path(diff.a_path)
+        self._new_path = self._normalize_path(diff.b_path)
 
         self._nloc = None
         self._complexity = None
         self._token_count = None
         self._function_list: List[Method] = []
         self._function_list_before: List[Method] = []
+        self._added_and_deleted_lines: Optional[Tuple[int, int]] = None
 
     def __hash__(self) -> int:
         """
@@ -243,11 +247,7 @@ class ModifiedFile:
 
         :return: int lines_added
         """
-        added_lines = 0
-        for line in self.diff.replace("\r", "").split("\n"):
-            if line.startswith("+") and not line.startswith("+++"):
-                added_lines += 1
-        return added_lines
+        return self._get_added_and_deleted_lines()[0]
 
     @property
     def deleted_lines(self) -> int:
@@ -256,11 +256,28 @@ class ModifiedFile:
 
         :return: int lines_deleted
         """
+        return self._get_added_and_deleted_lines()[1]
+
+    def _get_added_and_deleted_lines(self) -> Tuple[int, int]:
+        """
+        Count the added and deleted lines in a single pass over the diff.
+        The result is cached, since the process metrics ask for both.
+        """
+        if self._added_and_deleted_lines is None:
+            self._added_and_deleted_lines = self._count_added_and_deleted_lines(self.diff)
+
+        return self._added_and_deleted_lines
+
+    @staticmethod
+    def _count_added_and_deleted_lines(diff: str) -> Tuple[int, int]:
+        added_lines = 0
         deleted_lines = 0
-        for line in self.diff.replace("\r", "").split("\n"):
-            if line.startswith("-") and not line.startswith("---"):
+        for line in diff.replace("\r", "").split("\n"):
+            if line.startswith("+") and not line.startswith("+++"):
+                added_lines += 1
+            elif line.startswith("-") and not line.startswith("---"):
                 deleted_lines += 1
-        return deleted_lines
+        return added_lines, deleted_lines
 
     @property
     def old_path(self) -> Optional[str]:
@@ -269,9 +286,7 @@ class ModifiedFile:
 
         :return: str old_path
         """
-        if self._c_diff.a_path:
-            return str(Path(self._c_diff.a_path))
-        return None
+        return self._old_path
 
     @property
     def new_path(self) -> Optional[str]:
@@ -280,8 +295,14 @@ class ModifiedFile:
 
         :return: str new_path
         """
-        if self._c_diff.b_path:
-            return str(Path(self._c_diff.b_path))
+        return self._new_path
+
+    @staticmethod
+    def _normalize_path(path: Optional[str]) -> Optional[str]:
+        # git paths are already normalized and always separated by '/':
+        # only the separator has to be converted, as Path(path) would do
+        if path:
+            return path if os.sep == '/' else path.replace('/', os.sep)
         return None
 
     @property
@@ -299,7 +320,9 @@ class ModifiedFile:
             assert self.old_path
             path = self.old_path
 
-        return Path(path).name
+        # called for every modified file by the file type filter: the path
+        # is already normalized, so there is no need to build a Path
+        return os.path.basename(path)
 
     @property
     def language_supported(self) -> bool:
@@ -310,6 +333,9 @@ class ModifiedFile:
 
         :return: True iff language of this Modification can be analyzed.
         """
+        # lizard loads the readers of all its languages: imported on first
+        # use, rather than whenever PyDriller is imported
+        import lizard_languages
         return lizard_languages.get_reader_for(self.filename) is not None
 
     @property
@@ -490,6 +516,7 @@ class ModifiedFile:
         if not self.language_supported:
             return
 
+        import lizard
         if self.source_code and self._nloc is None:
             analysis = lizard.analyze_file.analyze_source_code(
                 self.filename, self.source_code
@@ -765,8 +792,10 @@ class Commit:
 
         :return: List[Modification] modifications
         """
-        options = {}
-        if self._conf.get("histogram"):
+        options: Dict[str, Any] = {}
+        if self._conf.get("diff_algorithm") is not None:
+            options["diff-algorithm"] = self._conf.get("diff_algorithm")
+        elif self._conf.get("histogram"):
             options["histogram"] = True
 
         if self._conf.get("skip_whitespaces"):
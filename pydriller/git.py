@@ -18,17 +18,36 @@ This module includes 1 class, Git, representing a repository in Git.
 
 import logging
 import os
+import subprocess
+import threading
 from pathlib import Path
-from typing import List, Dict, Optional, Set, Generator
+from functools import partial
+from typing import List, Dict, Optional, Set, Generator, Tuple, Union
 
-from git import Repo, GitCommandError
-from git.objects import Commit as GitCommit
+from git import Actor, Repo, GitCommandError
+from git.cmd import Git as GitCmd
+from git.objects import Commit as GitCommit, Tree
+from git.objects.util import utctz_to_altz
+from gitdb.util import hex_to_bin
 
 from pydriller.domain.commit import Commit, ModificationType, ModifiedFile
 from pydriller.utils.conf import Conf
 
 logger = logging.getLogger(__name__)
 
+# metadata of a commit printed by git rev-list: NUL-terminated fields, as
+# the commit message can not contain NUL
+_COMMIT_FORMAT = '%H%x00%T%x00%P%x00%an%x00%ae%x00%ad%x00%cn%x00%ce%x00%cd%x00%B%x00'
+_COMMIT_FIELDS = 10
+
+# repositories whose commit-graph was already written by this process
+_commit_graph_repos: Set[str] = set()
+_commit_graph_lock = threading.Lock()
+
+# above this number of loose objects, they are packed before writing the
+# commit-graph (the threshold of git gc --auto is 6700)
+_MAX_LOOSE_OBJECTS = 5000
+
 
 class Git:
     """
@@ -85,10 +104,36 @@ class Git:
 
     def _open_repository(self):
         self._repo = Repo(str(self.path))
-        self._repo.config_writer().set_value("blame", "markUnblamableLines", "true").release()
         if self._conf.get("main_branch") is None:
             self._discover_main_branch(self._repo)
 
+    def write_commit_graph(self) -> None:
+        """
+        Write the commit-graph of the repository, with the Bloom filters of
+        the changed paths, once per process: git then walks the commits (and
+        filters them by path) without decompressing their objects. If the
+        repository has many loose objects, they are packed first, so that
+        reading them does not open a file per object.
+        """
+        with _commit_graph_lock:
+            if str(self.path) in _commit_graph_repos:
+                return
+            _commit_graph_repos.add(str(self.path))
+
+        try:
+            if self._count_loose_objects() > _MAX_LOOSE_OBJECTS:
+                self.repo.git.repack('-d', '-q')
+            self.repo.git.commit_graph('write', '--reachable', '--changed-paths')
+        except GitCommandError:
+            logger.debug(f"Could not write the commit-graph of {self.path}")
+
+    def _count_loose_objects(self) -> int:
+        for line in self.repo.git.count_objects('-v').splitlines():
+            key, value = line.split(':', 1)
+            if key == 'count':
+                return int(value)
+        return 0
+
     def _discover_main_branch(self, repo):
         try:
             self._conf.set_value("main_branch", repo.active_branch.name)
@@ -107,10 +152,15 @@ class Git:
         head_commit = self.repo.head.commit
         return Commit(head_commit, self._conf)
 
-    def get_list_commits(self, rev='HEAD', **kwargs) -> Generator[Commit, None, None]:
+    def get_list_commits(self, rev='HEAD', hashes: Optional[Set[str]] = None, paths: Optional[List[str]] = None,
+                         **kwargs) -> Generator[Commit, None, None]:
         """
         Return a generator of commits of all the commits in the repo.
 
+        :param Set[str] hashes: if not None, return only the commits with
+            these hashes: the others are skipped before being parsed
+        :param List[str] paths: if not None, return only the commits
+            modifying these paths (git pathspecs)
         :return: Generator[Commit], the generator of all the commits in the
             repo
         """
@@ -119,7 +169,7 @@ class Git:
             kwargs['reverse'] = True
 
         try:
-            for commit in self.repo.iter_commits(rev=rev, **kwargs):
+            for commit in self._iter_commits(rev, hashes, paths, **kwargs):
                 yield self.get_commit_from_gitpython(commit)
         except GitCommandError as gce:
             if "fatal: bad revision 'HEAD'" in str(gce):
@@ -127,6 +177,84 @@ class Git:
             else:
                 raise Exception(f"Error while getting commits: {gce}")
 
+    def _iter_commits(self, rev: Union[str, List[str]], hashes: Optional[Set[str]] = None,
+                      paths: Optional[List[str]] = None, **kwargs) -> Generator[GitCommit, None, None]:
+        """
+        Return the GitPython commits listed by git rev-list, as
+        Repo.iter_commits() does. Their metadata is read from the output of
+        rev-list itself, rather than loading every commit object through
+        git cat-file when it is first accessed.
+        """
+        revs = [rev] if isinstance(rev, str) else rev
+        # as GitPython does, refuse the options writing to files
+        GitCmd.check_unsafe_options(options=revs + list(kwargs), unsafe_options=GitCommit.unsafe_git_rev_options)
+
+        if paths is not None:
+            # without simplifying the history, which would skip the commits
+            # of the merged branches whose changes were not kept
+            kwargs['full-history'] = True
+        if hashes is None:
+            proc = self.repo.git.rev_list(rev, '--format=' + _COMMIT_FORMAT, '--date=raw', '--', *(paths or ()),
+                                          as_process=True, **kwargs)
+        else:
+            # list just the hashes first, and then read the metadata of the
+            # selected commits only (in the same order): git does not
+            # format the others at all
+            listing = self.repo.git.rev_list(rev, '--', *(paths or ()), as_process=True, **kwargs)
+            selected = [line for line in listing.stdout if line[:-1].decode('ascii') in hashes]
+            listing.wait()
+            if not selected:
+                return
+
+            proc = self.repo.git.rev_list('--no-walk=unsorted', '--stdin', '--format=' + _COMMIT_FORMAT, '--date=raw',
+                                          as_process=True, istream=subprocess.PIPE)
+            # rev-list reads all the commits from stdin before printing any
+            proc.stdin.write(b''.join(selected))
+            proc.stdin.close()
+
+        fields: List[bytes] = []
+        partial_field = b''
+        # the same few authors and committers sign most of the commits: share
+        # their Actor objects, rather than building two for every commit
+        actors: Dict[Tuple[str, str], Actor] = {}
+        for chunk in iter(partial(proc.stdout.read, 1 << 16), b''):
+            *complete_fields, partial_field = (partial_field + chunk).split(b'\0')
+            fields += complete_fields
+
+            complete = len(fields) - len(fields) % _COMMIT_FIELDS
+            for start in range(0, complete, _COMMIT_FIELDS):
+                yield self._commit_from_fields(fields[start:start + _COMMIT_FIELDS], actors)
+            del fields[:complete]
+
+        # raises GitCommandError if rev-list failed
+        proc.wait()
+
+    def _commit_from_fields(self, fields: List[bytes], actors: Dict[Tuple[str, str], Actor]) -> GitCommit:
+        # rev-list prints "commit <hash>" before the fields of every commit
+        hexsha = fields[0].rsplit(b'\n', 1)[-1].decode('ascii')
+        tree, parents, author_name, author_email, author_date, committer_name, committer_email, committer_date = \
+            (field.decode('utf-8', 'replace') for field in fields[1:9])
+        authored_date, author_tz = author_date.split()
+        committed_date, committer_tz = committer_date.split()
+
+        author = actors.get((author_name, author_email))
+        if author is None:
+            author = actors[author_name, author_email] = Actor(author_name, author_email)
+        committer = actors.get((committer_name, committer_email))
+        if committer is None:
+            committer = actors[committer_name, committer_email] = Actor(committer_name, committer_email)
+
+        return GitCommit(self.repo, hex_to_bin(hexsha),
+                         tree=Tree(self.repo, hex_to_bin(tree), Tree.tree_id << 12, ''),
+                         author=author,
+                         authored_date=int(authored_date),
+                         author_tz_offset=utctz_to_altz(author_tz),
+                         committer=committer,
+                         committed_date=int(committed_date),
+                         committer_tz_offset=utctz_to_altz(committer_tz),
+                         message=fields[9].decode('utf-8', 'replace'),
+                         parents=tuple(GitCommit(self.repo, hex_to_bin(parent)) for parent in parents.split()))
+
     def get_commit(self, commit_id: str) -> Commit:
         """
         Get the specified commit.
@@ -203,16 +331,28 @@ class Git:
             logger.debug(f"Tag {tag} not found")
             raise
 
-    def get_tagged_commits(self):
+    def get_tagged_commits(self) -> List[str]:
         """
         Obtain the hash of all the tagged commits.
 
         :return: list of tagged commits (can be empty if there are no tags)
         """
-        tags = []
-        for tag in self.repo.tags:
-            if tag.commit:
-                tags.append(tag.commit.hexsha)
+        # a single git call, instead of resolving the tags one by one.
+        # Annotated tags are followed by their dereferenced line ("<tag>^{}"),
+        # which holds the hash of the tagged commit.
+        try:
+            refs = self.repo.git.show_ref('--tags', '--dereference').splitlines()
+        except GitCommandError:
+            # show-ref exits with 1 when the repository has no tags
+            return []
+
+        tags: List[str] = []
+        for ref in refs:
+            commit_hash, ref_name = ref.split(' ', 1)
+            if ref_name.endswith('^{}'):
+                tags[-1] = commit_hash
+            else:
+                tags.append(commit_hash)
         return tags
 
     def get_commits_last_modified_lines(self, commit: Commit,
@@ -267,6 +407,9 @@ class Git:
             -> Dict[str, Set[str]]:
 
         commits: Dict[str, Set[str]] = {}
+        # most of the blamed lines come from a few commits: resolve each of
+        # their hashes once
+        buggy_hashes: Dict[str, str] = {}
 
         for mod in modifications:
             path = mod.new_path
@@ -291,7 +434,10 @@ class Git:
                             path = mod.new_path
 
                         assert path is not None, "We could not find the path to the file"
-                        commits.setdefault(path, set()).add(self.get_commit(buggy_commit).hash)
+                        buggy_hash = buggy_hashes.get(buggy_commit)
+                        if buggy_hash is None:
+                            buggy_hash = buggy_hashes[buggy_commit] = self.get_commit(buggy_commit).hash
+                        commits.setdefault(path, set()).add(buggy_hash)
             except GitCommandError:
                 logger.debug(f"Could not found file {mod.filename} in commit {commit.hash}. Probably a double rename!")
 
@@ -304,7 +450,9 @@ class Git:
                 args += ["--ignore-revs-file", hashes_to_ignore_path]
             else:
                 logger.info("'--ignore-revs-file' is only available from git v2.23")
-        return self.repo.git.blame(*args, '--', path).split('\n')
+        # the option is passed to the single command, rather than written in the
+        # repository config, which fails when the repository is opened concurrently
+        return self.repo.git(c='blame.markUnblamableLines=true').blame(*args, '--', path).split('\n')
 
     @staticmethod
     def _useless_line(line: str):
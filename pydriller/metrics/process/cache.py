@@ -0,0 +1,76 @@
+"""
+Module that stores the results of the process metrics on disk, so that
+they are not computed again in later runs.
+"""
+import hashlib
+import os
+import pickle
+import sqlite3
+from contextlib import closing
+from typing import Any, Tuple
+
+
+class MetricsCache:
+    """
+    Disk cache of the results of the process metrics, backed by a SQLite
+    database in `cache_dir`. Only the `max_entries` most recently used
+    results are kept.
+
+    E.g.
+
+    cache = MetricsCache('~/.cache/pydriller')
+    metric = CommitsCount(path, from_commit=c1, to_commit=c2, cache=cache)
+    """
+
+    # a counter, rather than a timestamp, keeps the order of the accesses
+    # even when they happen within the resolution of the clock
+    _NEXT_USE = '(SELECT COALESCE(MAX(last_used), 0) + 1 FROM results)'
+
+    def __init__(self, cache_dir: str, max_entries: int = 100):
+        """
+        :param str cache_dir: directory where the database is stored
+        :param int max_entries: maximum number of results to keep
+        """
+        cache_dir = os.path.expanduser(cache_dir)
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, 'pydriller-metrics.sqlite')
+        self.max_entries = max_entries
+
+        with closing(sqlite3.connect(self.path)) as connection, connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS results '
+                               '(key TEXT PRIMARY KEY, value BLOB NOT NULL, last_used INTEGER NOT NULL)')
+
+    @staticmethod
+    def _hash(key: Tuple[Any, ...]) -> str:
+        return hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+
+    def get(self, key: Tuple[Any, ...]) -> Any:
+        """
+        Return the result saved under `key`.
+
+        :param key: tuple identifying the result
+        :return: the result
+        :raises KeyError: if the result is not in the cache
+        """
+        hashed_key = self._hash(key)
+        with closing(sqlite3.connect(self.path)) as connection, connection:
+            row = connection.execute('SELECT value FROM results WHERE key = ?', (hashed_key,)).fetchone()
+            if row is None:
+                raise KeyError(key)
+            connection.execute(f'UPDATE results SET last_used = {self._NEXT_USE} WHERE key = ?', (hashed_key,))
+
+        return pickle.loads(row[0])
+
+    def set(self, key: Tuple[Any, ...], value: Any) -> None:
+        """
+        Save `value` under `key`, evicting the least recently used results
+        if the cache is full.
+
+        :param key: tuple identifying the result
+        :param value: the result
+        """
+        with closing(sqlite3.connect(self.path)) as connection, connection:
+            connection.execute(f'INSERT OR REPLACE INTO results VALUES (?, ?, {self._NEXT_USE})',
+                               (self._hash(key), pickle.dumps(value)))
+            connection.execute('DELETE FROM results WHERE key NOT IN '
+                               '(SELECT key FROM results ORDER BY last_used DESC LIMIT ?)', (self.max_entries,))
@@ -1,10 +1,10 @@
 """
 Module that calculates the number of files committed together.
 """
-import statistics
 from typing import Optional
 
-from pydriller.metrics.process.process_metric import ProcessMetric
+from pydriller.metrics.process.cache import MetricsCache
+from pydriller.metrics.process.process_metric import ProcessMetric, cached_metric
 
 
 class ChangeSet(ProcessMetric):
@@ -20,17 +20,29 @@ class ChangeSet(ProcessMetric):
                  since=None,
                  to=None,
                  from_commit: Optional[str] = None,
-                 to_commit: Optional[str] = None):
+                 to_commit: Optional[str] = None,
+                 num_workers: int = 1,
+                 cache: Optional[MetricsCache] = None,
+                 filepath: Optional[str] = None,
+                 backend: str = 'gitpython'):
 
-        super().__init__(path_to_repo, since=since, to=to, from_commit=from_commit, to_commit=to_commit)
-        self._initialize()
+        super().__init__(path_to_repo, since=since, to=to, from_commit=from_commit, to_commit=to_commit,
+                         num_workers=num_workers, cache=cache, filepath=filepath,
+                         backend=backend)
+        self.committed_together = self._initialize()
 
+    @cached_metric
     def _initialize(self):
 
-        self.committed_together = []
+        committed_together = []
 
+        # the number of files comes from the stats of the commit (numstat),
+        # so the patches of the files are never generated nor parsed
         for commit in self.repo_miner.traverse_commits():
-            self.committed_together.append(len(commit.modified_files))
+            # merge commits have no modified files, see Commit.modified_files
+            committed_together.append(0 if commit.merge else commit.files)
+
+        return committed_together
 
     def max(self):
         """
@@ -49,4 +61,4 @@ class ChangeSet(ProcessMetric):
         if not self.committed_together:
             return 0
 
-        return round(statistics.mean(self.committed_together))
+        return round(sum(self.committed_together) / len(self.committed_together))
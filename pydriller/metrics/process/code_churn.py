@@ -1,11 +1,11 @@
 """
 Module that calculates the number of hunks made to a commit file.
 """
-import statistics
-from typing import Optional, Dict, Tuple
+from typing import Any, Optional, Dict, Tuple
 
 from pydriller import ModificationType
-from pydriller.metrics.process.process_metric import ProcessMetric
+from pydriller.metrics.process.cache import MetricsCache
+from pydriller.metrics.process.process_metric import ProcessMetric, RenamedFiles, cached_metric
 
 
 class CodeChurn(ProcessMetric):
@@ -20,50 +20,65 @@ class CodeChurn(ProcessMetric):
     * average code churn per commit.
     """
 
+    _uses_diff = False
+
     def __init__(self, path_to_repo: str,
                  since=None,
                  to=None,
                  from_commit: Optional[str] = None,
                  to_commit: Optional[str] = None,
                  ignore_added_files=False,
-                 add_deleted_lines_to_churn=False):
+                 add_deleted_lines_to_churn=False,
+                 num_workers: int = 1,
+                 cache: Optional[MetricsCache] = None,
+                 filepath: Optional[str] = None,
+                 backend: str = 'gitpython'):
         """
         :ignore_added_files: if True, do not count churns for files when created
         :add_deleted_lines_to_churn: if True, also add deleted lines to churn calculation
         """
 
-        super().__init__(path_to_repo, since=since, to=to, from_commit=from_commit, to_commit=to_commit)
+        super().__init__(path_to_repo, since=since, to=to, from_commit=from_commit, to_commit=to_commit,
+                         num_workers=num_workers, cache=cache, filepath=filepath,
+                         backend=backend)
         self.ignore_added_files = ignore_added_files
         self.add_deleted_lines_to_churn = add_deleted_lines_to_churn
-        self.added_removed_lines: Dict[str, Tuple[int, int]] = {}
-        self._initialize()
+        self.files, self.added_removed_lines = self._initialize()
+
+    def _cache_key(self) -> Tuple[Any, ...]:
+        return super()._cache_key() + (self.ignore_added_files, self.add_deleted_lines_to_churn)
 
+    @cached_metric
     def _initialize(self):
-        renamed_files = {}
-        self.files = {}
+        renamed_files = RenamedFiles()
+        files = {}
+        added_removed_lines = {}
 
-        for commit in self.repo_miner.traverse_commits():
+        for commit, modified_files in self._commits():
 
-            for modified_file in commit.modified_files:
+            for modified_file in modified_files:
 
-                filepath = renamed_files.get(modified_file.new_path, modified_file.new_path)
+                filepath = renamed_files.find(modified_file.new_path)
 
-                if modified_file.change_type == ModificationType.RENAME:
-                    renamed_files[modified_file.old_path] = filepath
+                change_type = modified_file.change_type
+                if change_type == ModificationType.RENAME:
+                    renamed_files.union(modified_file.old_path, filepath)
 
-                if self.ignore_added_files and modified_file.change_type == ModificationType.ADD:
+                if self.ignore_added_files and change_type == ModificationType.ADD:
                     continue
 
                 added_lines = modified_file.added_lines
                 deleted_lines = modified_file.deleted_lines
-                self.added_removed_lines[filepath] = (added_lines, deleted_lines)
+                added_removed_lines[filepath] = (added_lines, deleted_lines)
 
                 if self.add_deleted_lines_to_churn:
                     churn = added_lines + deleted_lines
                 else:
                     churn = added_lines - deleted_lines
 
-                self.files.setdefault(filepath, []).append(churn)
+                files.setdefault(filepath, []).append(churn)
+
+        return files, added_removed_lines
 
     def get_added_and_removed_lines(self) -> Dict[str, Tuple[int, int]]:
         """
@@ -105,6 +120,6 @@ class CodeChurn(ProcessMetric):
         """
         avg_count = {}
         for path, churns in self.files.items():
-            avg_count[path] = round(statistics.mean(churns))
+            avg_count[path] = round(sum(churns) / len(churns))
 
         return avg_count
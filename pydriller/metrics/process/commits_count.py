@@ -1,9 +1,10 @@
 """
 Module that calculates the number of commits made to a file.
 """
+from collections import defaultdict
 
 from pydriller import ModificationType
-from pydriller.metrics.process.process_metric import ProcessMetric
+from pydriller.metrics.process.process_metric import ProcessMetric, RenamedFiles, cached_metric
 
 
 class CommitsCount(ProcessMetric):
@@ -12,19 +13,21 @@ class CommitsCount(ProcessMetric):
     measure the number of commits made to a file
     """
 
+    _uses_diff = False
+
+    @cached_metric
     def count(self):
-        files = {}
-        renamed_files = {}  # To keep track of renamed files
+        files = defaultdict(int)
+        renamed_files = RenamedFiles()  # To keep track of renamed files
 
-        for commit in self.repo_miner.traverse_commits():
+        for commit, modified_files in self._commits():
 
-            for modified_file in commit.modified_files:
+            for modified_file in modified_files:
 
-                filepath = renamed_files.get(modified_file.new_path,
-                                             modified_file.new_path)
+                filepath = renamed_files.find(modified_file.new_path)
                 if modified_file.change_type == ModificationType.RENAME:
-                    renamed_files[modified_file.old_path] = filepath
+                    renamed_files.union(modified_file.old_path, filepath)
 
-                files[filepath] = files.get(filepath, 0) + 1
+                files[filepath] += 1
 
-        return files
+        return dict(files)
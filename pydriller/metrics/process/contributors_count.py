@@ -5,8 +5,8 @@ modified file in the repo in a given time range.
 See https://dl.acm.org/doi/10.1145/2025113.2025119
 """
 from typing import Optional
-from pydriller import ModificationType
-from pydriller.metrics.process.process_metric import ProcessMetric
+from pydriller.metrics.process.cache import MetricsCache
+from pydriller.metrics.process.process_metric import ProcessMetric, cached_metric
 
 
 class ContributorsCount(ProcessMetric):
@@ -20,50 +20,44 @@ class ContributorsCount(ProcessMetric):
       authored less than 5% of code of a file.
     """
 
+    _uses_diff = False
+
     def __init__(self, path_to_repo: str,
                  since=None,
                  to=None,
                  from_commit: Optional[str] = None,
-                 to_commit: Optional[str] = None):
-
-        super().__init__(path_to_repo, since=since, to=to, from_commit=from_commit, to_commit=to_commit)
-        self._initialize()
-
+                 to_commit: Optional[str] = None,
+                 num_workers: int = 1,
+                 cache: Optional[MetricsCache] = None,
+                 filepath: Optional[str] = None,
+                 backend: str = 'gitpython'):
+
+        super().__init__(path_to_repo, since=since, to=to, from_commit=from_commit, to_commit=to_commit,
+                         num_workers=num_workers, cache=cache, filepath=filepath,
+                         backend=backend)
+        self.contributors, self.minor_contributors = self._initialize()
+
+    @cached_metric
     def _initialize(self):
 
-        self.contributors = {}
-        self.minor_contributors = {}
-
-        renamed_files = {}
-
-        for commit in self.repo_miner.traverse_commits():
+        contributors = {}
+        minor_contributors = {}
 
-            for modified_file in commit.modified_files:
+        files = self._lines_authored()
 
-                filepath = renamed_files.get(modified_file.new_path,
-                                             modified_file.new_path)
-
-                if modified_file.change_type == ModificationType.RENAME:
-                    renamed_files[modified_file.old_path] = filepath
-
-                author = commit.author.email.strip()
-                lines_authored = modified_file.added_lines + modified_file.deleted_lines
+        for path, contributions in files.items():
+            total = sum(contributions.values())
+            if total:
+                contributors_count = len(contributions)
+                # v/total < 5% is checked on integers as 20*v < total, that
+                # is v <= (total-1)//20: the bound is computed once per file
+                minor_bound = (total - 1) // 20
+                minor_contributors_count = len([v for v in contributions.values() if v <= minor_bound])
 
-                self.contributors[filepath] = self.contributors.get(filepath, {})
-                self.contributors[filepath][author] = self.contributors[filepath].get(author, 0) + lines_authored
+                contributors[path] = contributors_count
+                minor_contributors[path] = minor_contributors_count
 
-        for path, contributions in list(self.contributors.items()):
-            total = sum(contributions.values())
-            if total == 0:
-                del self.contributors[path]
-            else:
-                contributors_count = len(contributions.values())
-                minor_contributors_count = sum(1
-                                               for v in contributions.values()
-                                               if v/total < .05)
-
-                self.contributors[path] = contributors_count
-                self.minor_contributors[path] = minor_contributors_count
+        return contributors, minor_contributors
 
     def count(self):
         """
@@ -1,8 +1,8 @@
 """
 Module that calculates the experience of contributors of a file.
 """
-from pydriller import ModificationType
-from pydriller.metrics.process.process_metric import ProcessMetric
+
+from pydriller.metrics.process.process_metric import ProcessMetric, cached_metric
 
 
 class ContributorsExperience(ProcessMetric):
@@ -12,6 +12,9 @@ class ContributorsExperience(ProcessMetric):
     file in the provided evolution period [from_commit, to_commit].
     """
 
+    _uses_diff = False
+
+    @cached_metric
     def count(self):
         """
         Return the percentage of the lines authored by the highest contributor
@@ -21,31 +24,29 @@ class ContributorsExperience(ProcessMetric):
         :return: dict { filepath: float }
         of number of contributors for each modified file
         """
-        renamed_files = {}
-        files = {}
-
-        for commit in self.repo_miner.traverse_commits():
-
-            for modified_file in commit.modified_files:
-
-                filepath = renamed_files.get(modified_file.new_path,
-                                             modified_file.new_path)
-
-                if modified_file.change_type == ModificationType.RENAME:
-                    renamed_files[modified_file.old_path] = filepath
-
-                author = commit.author.email.strip()
-                lines_authored = modified_file.added_lines + modified_file.deleted_lines
-
-                files[filepath] = files.get(filepath, {})
-                files[filepath][author] = files[filepath].get(author, 0) + \
-                    lines_authored
-
-        for path, contributions in list(files.items()):
-            total = sum(contributions.values())
-            if total == 0:
-                del files[path]
-            else:
-                files[path] = round(100*max(contributions.values()) / total, 2)
-
-        return files
+        files = self._lines_authored()
+
+        experience = {}
+        for path, contributions in files.items():
+            # total and highest contribution in a single pass: files have
+            # few contributors, where a plain loop beats sum() plus max()
+            total = 0
+            highest = 0
+            for lines_authored in contributions.values():
+                total += lines_authored
+                if lines_authored > highest:
+                    highest = lines_authored
+
+            if total:
+                experience[path] = self._percentage(highest, total)
+
+        return experience
+
+    @staticmethod
+    def _percentage(part: int, total: int) -> float:
+        """
+        Return `part` as a percentage of `total`, rounded to two decimals.
+        Both values are line counts, so the rounding is done with integer
+        arithmetic instead of going through round(float, ndigits).
+        """
+        return ((part * 10000 + total // 2) // total) / 100
@@ -0,0 +1,137 @@
+"""
+Module that computes the modified files of the commits with a single
+`git diff-tree` per commit, for the metrics that need only the number of
+added and deleted lines of the files, and not their diff. git prints the
+patch of every file (not its --numstat), and the lines are counted on it
+with the same rule as ModifiedFile (e.g. an added line starting with "++"
+is not counted, as it looks like the "+++" header of a patch), without
+building GitPython's Diff objects.
+"""
+import os
+import sys
+from typing import Generator, Iterable, List, Optional, Set, Tuple
+
+from git import Git
+
+from pydriller import Commit, ModificationType, ModifiedFile
+
+# built once, rather than as a tuple for every modified file checked
+_ADDED_OR_DELETED = (ModificationType.ADD, ModificationType.DELETE)
+
+
+class DiffTreeModifiedFile:
+    """
+    File modified by a commit, as reported by git diff-tree. It exposes the
+    subset of ModifiedFile used by the process metrics that do not read
+    the diff: paths, change type and number of added and deleted lines.
+    """
+
+    # the modified files of a whole period can be kept in memory
+    __slots__ = ('change_type', 'old_path', 'new_path', 'added_lines', 'deleted_lines')
+
+    def __init__(self, status: str, old_path: str, new_path: str, old_id: str, new_id: str, patch: str):
+        self.change_type = self._from_status_to_modification_type(status, old_id, new_id)
+
+        # counted as ModifiedFile does (e.g. it skips the deleted lines
+        # starting with "--"), rather than with git's --numstat, so that all
+        # the ways of computing the metrics give the same results
+        self.added_lines, self.deleted_lines = ModifiedFile._count_added_and_deleted_lines(patch)
+
+        # as ModifiedFile, an added file has no old path (and a deleted file
+        # no new path) only when git prints its hunks: empty and binary
+        # files keep both
+        has_hunks = '\n@@ ' in patch
+        self.old_path = None if has_hunks and self.change_type == ModificationType.ADD \
+            else ModifiedFile._normalize_path(old_path)
+        self.new_path = None if has_hunks and self.change_type == ModificationType.DELETE \
+            else ModifiedFile._normalize_path(new_path)
+
+    @staticmethod
+    def _from_status_to_modification_type(status: str, old_id: str, new_id: str) -> ModificationType:
+        if status == 'A':
+            return ModificationType.ADD
+        if status == 'D':
+            return ModificationType.DELETE
+        if status.startswith('R'):
+            return ModificationType.RENAME
+        if old_id != new_id:
+            return ModificationType.MODIFY
+
+        return ModificationType.UNKNOWN
+
+
+def get_modified_files(commit: Commit, paths: Optional[Set[str]] = None) -> List[DiffTreeModifiedFile]:
+    """
+    Return the modified files of `commit`, with a single `git diff-tree`
+    that prints their status and their patch. As in Commit.modified_files,
+    merge commits have no modified files.
+
+    :param Commit commit: commit to diff
+    :param Set[str] paths: if not None, diff only these paths (separated
+        by '/'). The renames are detected only between them.
+    :return: List[DiffTreeModifiedFile] modified files
+    """
+    # diff-tree prints nothing for merge commits (without -m), so there is
+    # no need to load the commit to check it: that would also go through
+    # the git process of the Repo, which the worker threads can not share
+    pathspec = [] if paths is None else ['--'] + [':(literal)' + path for path in paths]
+    output = Git(commit.project_path).diff_tree('-r', '-M', '--raw', '-p', '-z', '--root', '--no-commit-id',
+                                                commit.hash, *pathspec)
+    if not output:
+        return []
+
+    # --raw prints ":<old mode> <new mode> <old id> <new id> <status>" and
+    # the path(s) of every file, separated by NULs. The patches follow
+    # after an empty field, one "diff --git" section per file, in the same
+    # order (a type change, e.g. a file replaced by a symlink, is printed
+    # as a deletion and an addition)
+    raw, _, patch = output.partition('\0\0diff --git ')
+    fields = iter(raw.split('\0'))
+    sections = iter(patch.split('\ndiff --git '))
+
+    modified_files: List[DiffTreeModifiedFile] = []
+    for field in fields:
+        if not field:
+            continue
+
+        _, _, old_id, new_id, status = field[1:].split(' ')
+        # the same paths come back in many commits: intern them, as they
+        # are also used as keys by the metrics
+        old_path = new_path = sys.intern(next(fields))
+        if status.startswith('R'):
+            new_path = sys.intern(next(fields))
+        file_patch = next(sections, '')
+        if status == 'T':
+            file_patch += '\n' + next(sections, '')
+        modified_files.append(DiffTreeModifiedFile(status, old_path, new_path, old_id, new_id, file_patch))
+
+    return modified_files
+
+
+def get_commits_modifying_file(commits: Iterable[Commit], filepath: str) \
+        -> Generator[Tuple[Commit, List[DiffTreeModifiedFile]], None, None]:
+    """
+    Return the `commits` (the ones modifying `filepath`, from the newest to
+    the oldest), each with its modified files. Only the paths the file had
+    are diffed, rather than all the files of the commit: if one of them was
+    added or deleted, the commit is diffed again in full, to detect whether
+    it was renamed.
+
+    :param Iterable[Commit] commits: commits to diff, from the newest to
+        the oldest, so that the renames are seen before the old paths
+    :param str filepath: path of the file in the newest commit
+    :return: Generator[Tuple[Commit, List[DiffTreeModifiedFile]]] the commits,
+        with their modified files
+    """
+    # all the paths the file had, as git reports them
+    paths = {filepath.replace(os.sep, '/')}
+    for commit in commits:
+        modified_files = get_modified_files(commit, paths)
+        if any(modified_file.change_type in _ADDED_OR_DELETED for modified_file in modified_files):
+            modified_files = get_modified_files(commit)
+            for modified_file in modified_files:
+                old_path, new_path = modified_file.old_path, modified_file.new_path
+                if modified_file.change_type == ModificationType.RENAME and old_path and new_path and \
+                        new_path.replace(os.sep, '/') in paths:
+                    paths.add(old_path.replace(os.sep, '/'))
+        yield commit, modified_files
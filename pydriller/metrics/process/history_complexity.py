@@ -13,13 +13,19 @@ hcpf_2 = HistoryComplexity(..., from_commit=c3, to_commit=c4).count()
 
 hcm = hcpf_1 + hcpf_2
 
+or, equivalently, by calling HistoryComplexity.count_periods(..., periods=[(c1, c2), (c3, c4)])
+
 See https://ieeexplore.ieee.org/document/5070510
 """
 
-from math import log
+import concurrent.futures
+from collections import Counter, defaultdict
+from itertools import repeat
+from math import fsum, log
+from typing import Dict, List, Tuple
 
 from pydriller import ModificationType
-from pydriller.metrics.process.process_metric import ProcessMetric
+from pydriller.metrics.process.process_metric import ProcessMetric, RenamedFiles, cached_metric
 
 
 class HistoryComplexity(ProcessMetric):
@@ -29,6 +35,9 @@ class HistoryComplexity(ProcessMetric):
     complexity of an evolution period.
     """
 
+    _uses_diff = False
+
+    @cached_metric
     def count(self):
         """
         Calculate the History Complexity Period Factor for each modified file \
@@ -41,21 +50,20 @@ class HistoryComplexity(ProcessMetric):
         }
         """
 
-        renamed_files = {}
-        files = {}
+        renamed_files = RenamedFiles()
+        files = defaultdict(int)
 
-        for commit in self.repo_miner.traverse_commits():
+        for commit, modified_files in self._commits():
 
-            for modified_file in commit.modified_files:
-                filepath = renamed_files.get(modified_file.new_path,
-                                             modified_file.new_path)
+            for modified_file in modified_files:
+                filepath = renamed_files.find(modified_file.new_path)
 
                 if modified_file.change_type == ModificationType.RENAME:
-                    renamed_files[modified_file.old_path] = filepath
+                    renamed_files.union(modified_file.old_path, filepath)
 
                 modifications = modified_file.added_lines + modified_file.deleted_lines
                 if modifications:
-                    files[filepath] = files.get(filepath, 0) + modifications
+                    files[filepath] += modifications
 
         # Total lines modified in the period
         total_modifications = sum(files.values())
@@ -67,13 +75,53 @@ class HistoryComplexity(ProcessMetric):
         for filepath in files:
             files[filepath] /= total_modifications
 
-        # Normalized entropy
+        # Normalized entropy. fsum keeps the sum of many small terms exact,
+        # and the change of base is applied once instead of per file.
         entropy = 0
-        if len(files.values()) > 1:
-            entropy = -sum(p*log(p+1/1e10, n_files) for p in files.values())
+        if n_files > 1:
+            entropy = -fsum(p*log(p+1/1e10) for p in files.values()) / log(n_files)
 
         for filepath in files:
             files[filepath] *= entropy
             files[filepath] = round(files[filepath] * 100, 2)
 
-        return files
+        return dict(files)
+
+    @staticmethod
+    def count_periods(path_to_repo: str, periods: List[Tuple[str, str]], num_workers: int = 1) -> Dict[str, float]:
+        """
+        Calculate the History Complexity Metric for each modified file, \
+        summing up its History Complexity Period Factor over the periods.
+
+        The periods are independent from each other: with num_workers > 1 \
+        they are computed in parallel, each in its own process.
+
+        :param str path_to_repo: path to a single repo
+        :param List[Tuple[str,str]] periods: list of (from_commit, to_commit)
+        :param int num_workers: number of processes
+        :return: dict
+        {
+            filepath: float
+        }
+        """
+        from_commits = [from_commit for from_commit, _ in periods]
+        to_commits = [to_commit for _, to_commit in periods]
+
+        # the factors of every period are merged as soon as they are ready,
+        # rather than after all the periods are computed.
+        # update() (differently from +) keeps the files with a factor of 0
+        hcm: Counter = Counter()
+        if num_workers == 1:
+            for hcpf in map(_count_period, repeat(path_to_repo), from_commits, to_commits):
+                hcm.update(hcpf)
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=num_workers) as executor:
+                for hcpf in executor.map(_count_period, repeat(path_to_repo), from_commits, to_commits):
+                    hcm.update(hcpf)
+
+        return {filepath: round(value, 2) for filepath, value in hcm.items()}
+
+
+def _count_period(path_to_repo: str, from_commit: str, to_commit: str) -> Dict[str, float]:
+    # module level function, so that it can be sent to the worker processes
+    return HistoryComplexity(path_to_repo, from_commit=from_commit, to_commit=to_commit).count()
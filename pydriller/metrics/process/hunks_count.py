@@ -4,7 +4,7 @@ Module that calculates the number of hunks made to a commit file.
 from statistics import median
 
 from pydriller import ModificationType
-from pydriller.metrics.process.process_metric import ProcessMetric
+from pydriller.metrics.process.process_metric import ProcessMetric, RenamedFiles, cached_metric
 
 
 class HunksCount(ProcessMetric):
@@ -18,24 +18,24 @@ class HunksCount(ProcessMetric):
     that range.
     """
 
+    @cached_metric
     def count(self):
         """
         Return the number of hunks for each modified file.
 
         :return: int number of hunks
         """
-        renamed_files = {}
+        renamed_files = RenamedFiles()
         files = {}
 
-        for commit in self.repo_miner.traverse_commits():
+        for commit, modified_files in self._commits():
 
-            for modified_file in commit.modified_files:
+            for modified_file in modified_files:
 
-                filepath = renamed_files.get(modified_file.new_path,
-                                             modified_file.new_path)
+                filepath = renamed_files.find(modified_file.new_path)
 
                 if modified_file.change_type == ModificationType.RENAME:
-                    renamed_files[modified_file.old_path] = filepath
+                    renamed_files.union(modified_file.old_path, filepath)
 
                 diff = modified_file.diff
                 is_hunk = False
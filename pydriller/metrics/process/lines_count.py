@@ -2,10 +2,10 @@
 Module that calculates the number of normalized added and deleted lines of a
 file.
 """
-import statistics
 from typing import Optional
 from pydriller import ModificationType
-from pydriller.metrics.process.process_metric import ProcessMetric
+from pydriller.metrics.process.cache import MetricsCache
+from pydriller.metrics.process.process_metric import ProcessMetric, RenamedFiles, cached_metric
 
 
 class LinesCount(ProcessMetric):
@@ -35,33 +35,43 @@ class LinesCount(ProcessMetric):
 
     """
 
+    _uses_diff = False
+
     def __init__(self, path_to_repo: str,
                  since=None,
                  to=None,
                  from_commit: Optional[str] = None,
-                 to_commit: Optional[str] = None):
-
-        super().__init__(path_to_repo, since=since, to=to, from_commit=from_commit, to_commit=to_commit)
-        self._initialize()
-
+                 to_commit: Optional[str] = None,
+                 num_workers: int = 1,
+                 cache: Optional[MetricsCache] = None,
+                 filepath: Optional[str] = None,
+                 backend: str = 'gitpython'):
+
+        super().__init__(path_to_repo, since=since, to=to, from_commit=from_commit, to_commit=to_commit,
+                         num_workers=num_workers, cache=cache, filepath=filepath,
+                         backend=backend)
+        self.lines_added, self.lines_removed = self._initialize()
+
+    @cached_metric
     def _initialize(self):
 
-        self.lines_added = {}
-        self.lines_removed = {}
+        lines_added = {}
+        lines_removed = {}
 
-        renamed_files = {}
-        for commit in self.repo_miner.traverse_commits():
+        renamed_files = RenamedFiles()
+        for commit, modified_files in self._commits():
 
-            for modified_file in commit.modified_files:
+            for modified_file in modified_files:
 
-                filepath = renamed_files.get(modified_file.new_path,
-                                             modified_file.new_path)
+                filepath = renamed_files.find(modified_file.new_path)
 
                 if modified_file.change_type == ModificationType.RENAME:
-                    renamed_files[modified_file.old_path] = filepath
+                    renamed_files.union(modified_file.old_path, filepath)
+
+                lines_added.setdefault(filepath, []).append(modified_file.added_lines)
+                lines_removed.setdefault(filepath, []).append(modified_file.deleted_lines)
 
-                self.lines_added.setdefault(filepath, []).append(modified_file.added_lines)
-                self.lines_removed.setdefault(filepath, []).append(modified_file.deleted_lines)
+        return lines_added, lines_removed
 
     def count(self):
         """
@@ -111,7 +121,7 @@ class LinesCount(ProcessMetric):
         """
         avg = {}
         for path, lines in self.lines_added.items():
-            avg[path] = round(statistics.mean(lines))
+            avg[path] = round(sum(lines) / len(lines))
 
         return avg
 
@@ -147,6 +157,6 @@ class LinesCount(ProcessMetric):
         """
         avg = {}
         for path, lines in self.lines_removed.items():
-            avg[path] = round(statistics.mean(lines))
+            avg[path] = round(sum(lines) / len(lines))
 
         return avg
@@ -2,9 +2,85 @@
 This module contains the abstract class to implement process metrics.
 """
 
+import concurrent.futures
+import logging
+import os
+import sys
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
-from typing import Optional
-from pydriller import Repository
+from functools import partial, wraps
+from itertools import chain, repeat
+from pathlib import Path
+from typing import Any, Callable, Dict, Generator, Iterable, List, Optional, Sequence, Tuple, TypeVar, Union
+from git import GitCommandError, Repo
+from git.cmd import Git as GitCmd
+
+from pydriller import Commit, ModificationType, ModifiedFile, Repository
+from pydriller.metrics.process import diff_tree, pygit2_diff
+from pydriller.metrics.process.cache import MetricsCache
+from pydriller.metrics.process.diff_tree import DiffTreeModifiedFile
+from pydriller.metrics.process.pygit2_diff import Pygit2ModifiedFile
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+AnyModifiedFile = Union[ModifiedFile, DiffTreeModifiedFile, Pygit2ModifiedFile]
+
+# traversals shared by the metrics created inside shared_traversal(), None
+# when no shared traversal is active. A context variable, rather than a
+# class attribute, so that the threads (and asyncio tasks) computing metrics
+# concurrently do not see each other's traversals
+_SHARED_COMMITS: 'ContextVar[Optional[Dict[Tuple[Any, ...], List[Tuple[Commit, Sequence[AnyModifiedFile]]]]]]' = \
+    ContextVar('_SHARED_COMMITS', default=None)
+
+
+class RenamedFiles:
+    """
+    Keep track of the renames seen while traversing the commits, so that
+    every old path of a file resolves to the path the metric reports it
+    under. Paths are stored as a disjoint-set forest with path compression:
+    a file renamed many times resolves in (almost) constant time instead of
+    walking the whole rename chain on every lookup.
+    """
+
+    def __init__(self) -> None:
+        self._parent: Dict[Optional[str], Optional[str]] = {}
+
+    def find(self, path: Optional[str]) -> Optional[str]:
+        """
+        Return the path under which `path` is tracked.
+
+        :param str path: path of the file in the commit under analysis
+        :return: str the resolved path
+        """
+        parent = self._parent
+        root = path
+        while root in parent:
+            root = parent[root]
+
+        # compress the chain, so next lookups hit the root directly
+        while path != root:
+            next_path = parent[path]
+            parent[path] = root
+            path = next_path
+
+        return root
+
+    def union(self, old_path: Optional[str], filepath: Optional[str]) -> None:
+        """
+        Record that `old_path` was renamed into `filepath`.
+
+        :param str old_path: path of the file before the rename
+        :param str filepath: path of the file after the rename
+        """
+        root = self.find(filepath)
+        if old_path != root:
+            self._parent[old_path] = root
+        else:
+            self._parent.pop(old_path, None)
 
 
 class ProcessMetric:
@@ -12,11 +88,19 @@ class ProcessMetric:
     Abstract class to implement process metrics
     """
 
+    # whether the metric reads the diff of the modified files: if not, the
+    # files are read from the stats of git, without generating the patches
+    _uses_diff = True
+
     def __init__(self, path_to_repo: str,
                  since: Optional[datetime] = None,
                  to: Optional[datetime] = None,
                  from_commit: Optional[str] = None,
-                 to_commit: Optional[str] = None):
+                 to_commit: Optional[str] = None,
+                 num_workers: int = 1,
+                 cache: Optional[MetricsCache] = None,
+                 filepath: Optional[str] = None,
+                 backend: str = 'gitpython'):
         """
         :path_to_repo: path to a single repo
 
@@ -27,6 +111,23 @@ class ProcessMetric:
         :param str from_commit: starting commit (only if `since` is None)
 
         :param str to_commit: ending commit (only if `to` is None)
+
+        :param int num_workers: number of threads used to compute the diffs
+            of the commits. The order of the commits is maintained.
+
+        :param MetricsCache cache: disk cache where the results are looked up
+            before traversing the commits (only for local repositories)
+
+        :param str filepath: path of the file (in the last commit of the
+            period) to compute the metric on. Only the commits that modified
+            the file, following its renames, are analyzed.
+
+        :param str backend: library used to compute the diffs of the commits:
+            'gitpython' (default) or 'pygit2', which diffs in-process with
+            libgit2 instead of running git for every commit. It requires
+            pygit2, and it ignores `num_workers`. With `filepath`, the
+            commits modifying the file are found comparing their trees
+            with libgit2, rather than with `git log --follow`.
         """
 
         if not since and not from_commit:
@@ -35,19 +136,316 @@ class ProcessMetric:
         if not to and not to_commit:
             raise TypeError('You must pass one between to and to_commit')
 
+        if backend not in ('gitpython', 'pygit2'):
+            raise ValueError(f"Unknown backend '{backend}': use 'gitpython' or 'pygit2'")
+
+        if backend == 'pygit2' and pygit2_diff.pygit2 is None:
+            raise ImportError("The 'pygit2' backend requires pygit2: pip install pygit2")
+
+        self.num_workers = num_workers
+        self.backend = backend
+        self.filepath = str(Path(filepath)) if filepath is not None else None
+
+        # the same local repository can be passed with different paths
+        is_remote = Repository._is_remote(path_to_repo)
+        repo_key = path_to_repo if is_remote else os.path.realpath(path_to_repo)
+        self._traversal_key = (repo_key, since, to, from_commit, to_commit, self.filepath, backend,
+                               self._uses_diff)
+        self.cache = None if is_remote else cache
+
+        self._period = (path_to_repo, since, to, from_commit, to_commit)
+        # with pygit2, the commits of the file are selected while walking
+        # the period, in _pygit2_walk()
+        self.repo_miner = self._repository(self.filepath if backend == 'gitpython' else None)
+
+    def _repository(self, filepath: Optional[str]) -> Repository:
+        """
+        Return the Repository traversing the commits of the evolution period
+        (only the ones modifying `filepath`, if not None).
+        """
+        path_to_repo, since, to, from_commit, to_commit = self._period
         if from_commit and to_commit and from_commit == to_commit:  # Use 'single' param to avoid Warning
-            self.repo_miner = Repository(path_to_repo, single=from_commit)
+            return Repository(path_to_repo, single=from_commit,
+                              filepath=filepath, include_deleted_files=True)
+
+        return Repository(path_to_repo=path_to_repo,
+                          since=since,
+                          to=to,
+                          from_commit=from_commit,
+                          to_commit=to_commit,
+                          filepath=filepath,
+                          # the file may not exist anymore
+                          include_deleted_files=True,
+                          order='reverse')
+
+    @staticmethod
+    @contextmanager
+    def shared_traversal() -> Generator[None, None, None]:
+        """
+        Share the traversal of the commits between the metrics created in
+        this context: metrics computed on the same repository and evolution
+        period walk the commits (and parse their diffs) only once.
+
+        E.g.
+
+        with ProcessMetric.shared_traversal():
+            churn = CodeChurn(path, from_commit=c1, to_commit=c2).count()
+            hunks = HunksCount(path, from_commit=c1, to_commit=c2).count()
+
+        Create the metrics reading the diffs (e.g. HunksCount) first: the
+        other metrics reuse their traversal, while the opposite is not
+        possible.
+
+        Metrics computed on a single file (`filepath`) share the traversal
+        of all the commits of the period, rather than walking the commits
+        of each file: computing the metric on many files walks the history
+        only once.
+
+        The commits are kept in memory until the context exits. A nested
+        context (e.g. count_files() called inside one) reuses the traversals
+        of the enclosing one, and leaves them in place when it exits. The
+        context is local to the thread (or asyncio task) that entered it.
+        """
+        previous = _SHARED_COMMITS.get()
+        token = _SHARED_COMMITS.set({} if previous is None else previous)
+        try:
+            yield
+        finally:
+            _SHARED_COMMITS.reset(token)
+
+    def _commits(self) -> Generator[Tuple[Commit, Sequence[AnyModifiedFile]], None, None]:
+        """
+        Return the commits of the evolution period, each paired with its
+        list of modified files.
+        """
+        shared_commits = _SHARED_COMMITS.get()
+        if shared_commits is None:
+            if self.backend == 'pygit2' and self.filepath is not None:
+                return self._follow_file(self._pygit2_walk(self.filepath))
+            if self.filepath is not None and not self._uses_diff:
+                # the commits modifying the file are few: diff only its
+                # paths, rather than all the files of every commit
+                return self._follow_file(diff_tree.get_commits_modifying_file(self.repo_miner.traverse_commits(),
+                                                                              self.filepath))
+            return self._follow_file(self._diff_commits(self.repo_miner))
 
+        # the same traversal serves the metrics on every file
+        repo_key, since, to, from_commit, to_commit, _, backend, uses_diff = self._traversal_key
+        key = (repo_key, since, to, from_commit, to_commit, None, backend, uses_diff)
+        # a metric not reading the diff can use the files of a traversal
+        # with the diffs, if any, but not the other way around
+        diff_key = key[:-1] + (True,)
+        if key not in shared_commits and diff_key in shared_commits:
+            key = diff_key
+        if key not in shared_commits:
+            repo_miner = self.repo_miner if self.filepath is None else self._repository(None)
+            shared_commits[key] = list(self._diff_commits(repo_miner))
+        return self._follow_file(shared_commits[key])
+
+    def _follow_file(self, commits: Iterable[Tuple[Commit, Sequence[AnyModifiedFile]]]) \
+            -> Generator[Tuple[Commit, Sequence[AnyModifiedFile]], None, None]:
+        if self.filepath is None:
+            yield from commits
+            return
+
+        # drop the files other than filepath, and the commits not modifying
+        # it (if the traversal is not shared, git log --follow already
+        # skipped them). The renames are resolved as the metrics do, so
+        # that the file is reported under the same path.
+        renamed_files = RenamedFiles()
+        for commit, modified_files in commits:
+            file_modified_files = []
+            for modified_file in modified_files:
+                filepath = renamed_files.find(modified_file.new_path)
+                if modified_file.change_type == ModificationType.RENAME:
+                    renamed_files.union(modified_file.old_path, filepath)
+
+                if filepath == self.filepath:
+                    file_modified_files.append(modified_file)
+
+            if file_modified_files:
+                yield commit, file_modified_files
+
+    def _pygit2_walk(self, filepath: str) -> Generator[Tuple[Commit, Sequence[AnyModifiedFile]], None, None]:
+        # git log --follow diffs every commit of the history to find the
+        # ones modifying the file: libgit2 compares the tree entries of its
+        # paths instead, and diffs only the commits where they changed
+        commits = iter(self.repo_miner.traverse_commits())
+        # the path of the repo is known once the traversal started (remote
+        # repos are cloned by it)
+        first_commit = next(commits, None)
+        if first_commit is None:
+            return
+
+        repo = pygit2_diff.pygit2.Repository(first_commit.project_path)
+        yield from pygit2_diff.get_commits_modifying_file(repo, chain([first_commit], commits), filepath)
+
+    def _diff_commits(self, repo_miner: Repository) -> Generator[Tuple[Commit, Sequence[AnyModifiedFile]], None, None]:
+        commits = repo_miner.traverse_commits()
+        if self.backend == 'pygit2':
+            repo = None
+            for commit in commits:
+                if repo is None:
+                    repo = pygit2_diff.pygit2.Repository(commit.project_path)
+                yield commit, pygit2_diff.get_modified_files(repo, commit)
+            return
+
+        if self.num_workers == 1:
+            for commit in commits:
+                if self._uses_diff:
+                    yield commit, commit.modified_files
+                else:
+                    yield commit, diff_tree.get_modified_files(commit)
+            return
+
+        # the Repos opened by the worker threads, closed (with their git
+        # processes) once the workers are done
+        repos: List[Repo] = []
+        with_modified_files: Callable[[Commit], Tuple[Commit, Sequence[AnyModifiedFile]]]
+        if self._uses_diff:
+            with_modified_files = partial(self._with_modified_files, threading.local(), repos)
         else:
-            self.repo_miner = Repository(path_to_repo=path_to_repo,
-                                         since=since,
-                                         to=to,
-                                         from_commit=from_commit,
-                                         to_commit=to_commit,
-                                         order='reverse')
+            with_modified_files = self._with_diff_tree_files
+
+        # the order of the commits is kept, as the metrics rely on it to
+        # follow the renames, and only a few chunks of them are diffed ahead
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.num_workers) as executor:
+                yield from Repository._map_in_window(executor, with_modified_files, commits, self.num_workers, 4,
+                                                     ordered=True)
+        finally:
+            for thread_repo in repos:
+                thread_repo.close()
+
+    @staticmethod
+    def _with_diff_tree_files(commit: Commit) -> Tuple[Commit, Sequence[AnyModifiedFile]]:
+        return commit, diff_tree.get_modified_files(commit)
+
+    @staticmethod
+    def _with_modified_files(thread_local: threading.local, repos: List[Repo],
+                             commit: Commit) -> Tuple[Commit, Sequence[AnyModifiedFile]]:
+        # GitPython reads the objects through a single git process per Repo,
+        # which can not be shared between threads: every thread diffs the
+        # commit through its own Repo.
+        if not hasattr(thread_local, 'repo'):
+            thread_local.repo = Repo(commit.project_path)
+            repos.append(thread_local.repo)
+        local_commit = Commit(thread_local.repo.commit(commit.hash), commit._conf)
+        return commit, local_commit.modified_files
+
+    def _lines_authored(self) -> Dict[Optional[str], Dict[str, int]]:
+        """
+        Return, for every file modified in the evolution period, the lines
+        (added plus deleted) authored by each contributor, keyed by email.
+        """
+        renamed_files = RenamedFiles()
+        files: Dict[Optional[str], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+        for commit, modified_files in self._commits():
+
+            # the same few emails are used as keys for every file
+            author = sys.intern((commit.author.email or '').strip())
+
+            for modified_file in modified_files:
+
+                filepath = renamed_files.find(modified_file.new_path)
+
+                if modified_file.change_type == ModificationType.RENAME:
+                    renamed_files.union(modified_file.old_path, filepath)
+
+                lines_authored = modified_file.added_lines + modified_file.deleted_lines
+
+                files[filepath][author] += lines_authored
+
+        return files
+
+    def _cache_key(self) -> Tuple[Any, ...]:
+        """
+        Return the key identifying the results of the metric in the cache.
+        Metrics having options that change their results must add them
+        to the key.
+        """
+        # the commits in the period depend on where the ends of the range
+        # point (a branch or a tag can move) and on the HEAD of the
+        # repository (e.g. dates or relative references): all of them are
+        # resolved to hashes, with a single git call and no Repo
+        repo_key, since, to, from_commit, to_commit, filepath, backend, uses_diff = self._traversal_key
+        ends = [ref for ref in (from_commit, to_commit) if ref is not None]
+        head, *hashes = GitCmd(repo_key).rev_parse('HEAD', *(ref + '^{commit}' for ref in ends)).split()
+        resolved = dict(zip(ends, hashes))
+        from_hash = resolved.get(from_commit) if from_commit is not None else None
+        to_hash = resolved.get(to_commit) if to_commit is not None else None
+        return (type(self).__name__, repo_key, since, to, from_hash, to_hash, filepath, backend, uses_diff, head)
 
     def count(self):
         """
         Implement the main functionality of the metric
         """
         return 0
+
+    @classmethod
+    def count_files(cls, path_to_repo: str, filepaths: List[str], num_workers: int = 1, **kwargs) -> Dict[str, Any]:
+        """
+        Compute the metric (its count()) on each of the given files.
+
+        The files are independent from each other: with num_workers > 1
+        they are computed in parallel, each in its own process. Otherwise,
+        they share a single traversal of the commits.
+
+        E.g.
+
+        CommitsCount.count_files(path, ['a.py', 'b.py'], from_commit=c1, to_commit=c2)
+
+        :param str path_to_repo: path to a single repo
+        :param List[str] filepaths: paths of the files (in the last commit
+            of the period)
+        :param int num_workers: number of processes
+        :param kwargs: the other parameters of the metric (e.g. since, to)
+        :return: dict { filepath: count } with the files modified in the
+            period
+        """
+        files = {}
+        if num_workers == 1:
+            with ProcessMetric.shared_traversal():
+                for filepath in filepaths:
+                    files.update(_count_file(cls, path_to_repo, filepath, kwargs))
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=num_workers) as executor:
+                for file_count in executor.map(_count_file, repeat(cls), repeat(path_to_repo), filepaths,
+                                               repeat(kwargs)):
+                    files.update(file_count)
+
+        return files
+
+
+def _count_file(metric_class: type, path_to_repo: str, filepath: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    # module level function, so that it can be sent to the worker processes
+    return metric_class(path_to_repo, filepath=filepath, **kwargs).count()
+
+
+def cached_metric(method: Callable[..., T]) -> Callable[..., T]:
+    """
+    Decorator for the methods of the metrics that traverse the commits:
+    if the metric has a cache, the result of the method is read from the
+    cache, and it is computed (and saved) only when missing.
+    """
+
+    @wraps(method)
+    def wrapper(self: ProcessMetric, *args, **kwargs) -> T:
+        if self.cache is None:
+            return method(self, *args, **kwargs)
+
+        try:
+            key = self._cache_key() + (method.__name__, args, sorted(kwargs.items()))
+        except GitCommandError:
+            # e.g. a from_commit missing in the repository: the traversal
+            # reports it
+            return method(self, *args, **kwargs)
+        try:
+            return self.cache.get(key)
+        except KeyError:
+            result = method(self, *args, **kwargs)
+            self.cache.set(key, result)
+            return result
+
+    return wrapper
@@ -0,0 +1,143 @@
+"""
+Module that computes the modified files of the commits in-process with
+libgit2 (through pygit2), instead of spawning a git diff for every commit.
+pygit2 is an optional dependency: install it with `pip install pygit2`.
+"""
+import os
+from typing import Generator, Iterable, List, Tuple
+
+from pydriller import Commit, ModificationType, ModifiedFile
+
+try:
+    import pygit2
+except ImportError:  # pragma: no cover
+    pygit2 = None  # type: ignore
+
+
+class Pygit2ModifiedFile:
+    """
+    File modified by a commit, as computed by libgit2. It exposes the
+    subset of ModifiedFile used by the process metrics: paths, change
+    type, diff and number of added and deleted lines.
+    """
+
+    # the modified files of a whole period can be kept in memory
+    __slots__ = ('change_type', 'diff', 'old_path', 'new_path', 'added_lines', 'deleted_lines')
+
+    def __init__(self, patch):
+        delta = patch.delta
+        self.change_type = self._from_delta_to_modification_type(delta)
+
+        # as git diff (and so ModifiedFile.diff), without the file header
+        diff_lines = []
+        for hunk in patch.hunks:
+            # git strips the trailing spaces of the function context
+            diff_lines.append(hunk.header.rstrip() + '\n')
+            for line in hunk.lines:
+                if line.origin in '+- ':
+                    diff_lines.append(line.origin + line.content)
+                else:
+                    # "No newline at end of file" marker
+                    diff_lines.append(line.content)
+        self.diff = ''.join(diff_lines)
+
+        old_path = delta.old_file.path
+        new_path = delta.new_file.path
+        if delta.is_binary:
+            a_path = '/dev/null' if self.change_type == ModificationType.ADD else 'a/' + old_path
+            b_path = '/dev/null' if self.change_type == ModificationType.DELETE else 'b/' + new_path
+            self.diff = f'Binary files {a_path} and {b_path} differ\n'
+
+        # ModifiedFile reads the paths from the ---/+++ lines of the patch,
+        # falling back to the "diff --git" header when they are missing
+        # (e.g. empty or binary files): only then an added file has an
+        # old path and a deleted file a new path
+        has_text_patch = bool(patch.hunks)
+        self.old_path = None if has_text_patch and self.change_type == ModificationType.ADD \
+            else ModifiedFile._normalize_path(old_path)
+        self.new_path = None if has_text_patch and self.change_type == ModificationType.DELETE \
+            else ModifiedFile._normalize_path(new_path)
+
+        # counted as ModifiedFile does, rather than with patch.line_stats,
+        # so that both backends give the same results
+        self.added_lines, self.deleted_lines = ModifiedFile._count_added_and_deleted_lines(self.diff)
+
+    @staticmethod
+    def _from_delta_to_modification_type(delta) -> ModificationType:
+        if delta.status == pygit2.enums.DeltaStatus.ADDED:
+            return ModificationType.ADD
+        if delta.status == pygit2.enums.DeltaStatus.DELETED:
+            return ModificationType.DELETE
+        if delta.status == pygit2.enums.DeltaStatus.RENAMED:
+            return ModificationType.RENAME
+        if delta.old_file.id != delta.new_file.id:
+            return ModificationType.MODIFY
+
+        return ModificationType.UNKNOWN
+
+
+def get_modified_files(repo, commit: Commit) -> List[Pygit2ModifiedFile]:
+    """
+    Return the modified files of `commit`, computed with libgit2. As in
+    Commit.modified_files, merge commits have no modified files.
+
+    :param pygit2.Repository repo: repository of the commit
+    :param Commit commit: commit to diff
+    :return: List[Pygit2ModifiedFile] modified files
+    """
+    git_commit = repo.get(commit.hash)
+    flags = pygit2.enums.DiffOption.INDENT_HEURISTIC
+    if len(git_commit.parent_ids) == 1:
+        diff = repo.diff(git_commit.parent_ids[0], git_commit.id, flags=flags)
+    elif len(git_commit.parent_ids) > 1:
+        return []
+    else:
+        # first commit of the repo: compare it with the empty tree
+        diff = git_commit.tree.diff_to_tree(flags=flags, swap=True)
+
+    diff.find_similar()
+    return [Pygit2ModifiedFile(patch) for patch in diff if patch is not None]
+
+
+def get_commits_modifying_file(repo, commits: Iterable[Commit], filepath: str) \
+        -> Generator[Tuple[Commit, List[Pygit2ModifiedFile]], None, None]:
+    """
+    Return the commits modifying `filepath` (following its renames), each
+    with its modified files. A commit modifies the file if the tree entry
+    of any of its paths differs from the one of the first parent: only
+    these commits are diffed. As in Commit.modified_files, merge commits
+    have no modified files, so they are skipped.
+
+    :param pygit2.Repository repo: repository of the commits
+    :param Iterable[Commit] commits: commits to check, from the newest to
+        the oldest, so that the renames are seen before the old paths
+    :param str filepath: path of the file in the newest commit
+    :return: Generator[Tuple[Commit, List[Pygit2ModifiedFile]]] the commits
+        modifying the file, with their modified files
+    """
+    # all the paths the file had, as libgit2 reports them
+    paths = {filepath.replace(os.sep, '/')}
+    for commit in commits:
+        git_commit = repo.get(commit.hash)
+        if len(git_commit.parent_ids) > 1:
+            continue
+
+        parent_tree = git_commit.parents[0].tree if git_commit.parent_ids else None
+        if all(_entry_id(git_commit.tree, path) == _entry_id(parent_tree, path) for path in paths):
+            continue
+
+        modified_files = get_modified_files(repo, commit)
+        for modified_file in modified_files:
+            if modified_file.change_type == ModificationType.RENAME and \
+                    modified_file.new_path.replace(os.sep, '/') in paths:
+                paths.add(modified_file.old_path.replace(os.sep, '/'))
+        yield commit, modified_files
+
+
+def _entry_id(tree, path: str):
+    if tree is None:
+        return None
+    try:
+        return tree[path].id
+    except KeyError:
+        return None
@@ -17,17 +17,20 @@ This module includes 1 class, Repository, main class of PyDriller.
 """
 
 import logging
-import math
 import os
 import shutil
 import tempfile
 import concurrent.futures
+from collections import deque
+from itertools import count, islice
 from contextlib import contextmanager
 from datetime import datetime
-from pathlib import Path
-from typing import List, Generator, Optional, Union
+from pathlib import Path, PurePosixPath
+from urllib.parse import urlsplit
+from typing import Any, AsyncGenerator, Callable, Deque, Dict, List, Generator, Iterable, Optional, Set, Tuple, Union
 
 from git import Repo
+from git.cmd import Git as GitCmd
 
 from pydriller.domain.commit import Commit
 from pydriller.git import Git
@@ -49,6 +52,7 @@ class Repository:
                  include_refs: bool = False,
                  include_remotes: bool = False,
                  num_workers: int = 1,
+                 repo_workers: int = 2,
                  only_in_branch: Optional[str] = None,
                  only_modifications_with_file_types: Optional[List[str]] = None,
                  only_no_merge: bool = False,
@@ -58,8 +62,10 @@ class Repository:
                  filepath: Optional[str] = None,
                  include_deleted_files: bool = False,
                  histogram_diff: bool = False,
+                 diff_algorithm: Optional[str] = None,
                  skip_whitespaces: bool = False,
                  clone_repo_to: Optional[str] = None,
+                 partial_clone: bool = False,
                  order: Optional[str] = None,
                  use_mailmap: bool = False):
         """
@@ -88,6 +94,9 @@ class Repository:
         :param bool include_refs: whether to include refs and HEAD in commit analysis
         :param bool include_remotes: whether to include remote commits in analysis
         :param int num_workers: number of workers (i.e., threads). Please note, if num_workers > 1 the commits order is not maintained.
+        :param int repo_workers: number of repositories prepared in parallel (cloned if remote and, with `filepath`,
+            searched for the commits modifying the file), while the previous ones are analyzed. By default, the next
+            repository is prepared while the current one is analyzed
         :param str only_in_branch: only commits in this branch will be analyzed
         :param List[str] only_modifications_with_file_types: only
             modifications with that file types will be analyzed
@@ -97,8 +106,12 @@ class Repository:
         :param List[str] only_commits: only these commits will be analyzed
         :param bool only_releases: analyze only tagged commits
         :param bool histogram_diff: add the "--histogram" option when asking for the diff
+        :param str diff_algorithm: algorithm used when asking for the diff: one of 'myers' (the default of git),
+            'minimal', 'patience' or 'histogram'. It takes precedence over `histogram_diff`
         :param bool skip_whitespaces: add the "-w" option when asking for the diff
         :param str clone_repo_to: if the repo under analysis is remote, clone the repo to the specified directory
+        :param bool partial_clone: if the repo under analysis is remote, clone it without the content of the files,
+            which git downloads when a diff needs it (useful when only the metadata of the commits is analyzed)
         :param str filepath: only commits that modified this file will be analyzed
         :param bool include_deleted_files: include commits modifying a deleted file (useful when analyzing a deleted `filepath`)
         :param str order: order of commits. It can be one of: 'date-order',
@@ -129,6 +142,7 @@ class Repository:
             "include_refs": include_refs,
             "include_remotes": include_remotes,
             "num_workers": num_workers,
+            "repo_workers": repo_workers,
             "only_in_branch": only_in_branch,
             "only_modifications_with_file_types": file_modification_set,
             "only_no_merge": only_no_merge,
@@ -141,7 +155,9 @@ class Repository:
             "filepath_commits": None,
             "tagged_commits": None,
             "histogram": histogram_diff,
+            "diff_algorithm": diff_algorithm,
             "clone_repo_to": clone_repo_to,
+            "partial_clone": partial_clone,
             "order": order,
             "use_mailmap": use_mailmap
         }
@@ -153,136 +169,335 @@ class Repository:
 
     @staticmethod
     def _is_remote(repo: str) -> bool:
-        return repo.startswith(("git@", "https://", "http://", "git://"))
+        return repo.startswith(("git@", "https://", "http://", "ssh://", "git://"))
 
     def _clone_remote_repo(self, tmp_folder: str, repo: str) -> str:
         repo_folder = os.path.join(tmp_folder, self._get_repo_name_from_url(repo))
         if os.path.isdir(repo_folder):
             logger.info(f"Reusing folder {repo_folder} for {repo}")
         else:
+            self._check_remote_tags(repo)
             logger.info(f"Cloning {repo} in temporary folder {repo_folder}")
-            Repo.clone_from(url=repo, to_path=repo_folder)
+            multi_options = []
+            # a single commit reads the files of just the commit and its
+            # parent: the others are not downloaded. The history and the
+            # branches are, to know the branches containing the commit
+            if self._conf.get('partial_clone') or (self._cleanup and self._conf.get('single') is not None):
+                multi_options.append('--filter=blob:none')
+            Repo.clone_from(url=repo, to_path=repo_folder, multi_options=multi_options)
 
         return repo_folder
 
-    def _clone_folder(self) -> str:
+    def _check_remote_tags(self, repo: str) -> None:
+        # a missing from_tag or to_tag would be found only after cloning the
+        # whole repo: list the tags of the remote first, which takes a single
+        # round trip and fails as fast on a wrong url
+        tags = [tag for tag in (self._conf.get('from_tag'), self._conf.get('to_tag')) if tag is not None]
+        if not tags:
+            return
+
+        # "<hash>\trefs/tags/<tag>" lines: the annotated tags are followed by
+        # their dereferenced line ("<tag>^{}"), which is skipped
+        output = str(GitCmd().ls_remote('--tags', repo, *tags))
+        remote_tags = {ref[len('refs/tags/'):] for ref in (line.split('\t', 1)[1] for line in output.splitlines())
+                       if not ref.endswith('^{}')}
+        for tag in tags:
+            if tag not in remote_tags:
+                # as GitPython does for the tags missing in a local repo
+                raise IndexError(f"Tag {tag} not found in {repo}")
+
+    def _clone(self, repo: str) -> Tuple[str, Optional[tempfile.TemporaryDirectory]]:
+        # every repo gets its own temporary directory (returned, so that it
+        # can be cleaned up later): the next repos can be cloned while the
+        # previous one is still analyzed
+        tmp_dir = None
         if self._conf.get('clone_repo_to'):
             clone_folder = str(Path(self._conf.get('clone_repo_to')))
             if not os.path.isdir(clone_folder):
                 raise Exception("Not a directory: {0}".format(clone_folder))
         else:
-            # Save the temporary directory so we can clean it up later
-            self._tmp_dir = tempfile.TemporaryDirectory()
-            clone_folder = self._tmp_dir.name
-        return clone_folder
+            tmp_dir = tempfile.TemporaryDirectory()
+            clone_folder = tmp_dir.name
+        return self._clone_remote_repo(clone_folder, repo), tmp_dir
+
+    def _prepare(self, path_repo: str) -> Tuple[str, Optional[tempfile.TemporaryDirectory], Optional[List[str]]]:
+        # the work on a repo that does not depend on the others (cloning it,
+        # finding the commits that modified the filepath): it can run in a
+        # worker thread, while the previous repos are analyzed
+        local_path_repo, tmp_dir = self._clone(path_repo) if self._is_remote(path_repo) else (path_repo, None)
+
+        filepath_commits = None
+        if self._conf.get('filepath') is not None:
+            # a Git object of its own: the one of the repo under analysis
+            # can not be shared across threads
+            git = Git(local_path_repo)
+            try:
+                if self._writes_commit_graph(path_repo):
+                    git.write_commit_graph()
+                filepath_commits = git.get_commits_modified_file(self._conf.get('filepath'),
+                                                                 self._conf.get('include_deleted_files'))
+            finally:
+                git.clear()
+
+        return local_path_repo, tmp_dir, filepath_commits
+
+    def _writes_commit_graph(self, path_repo: str) -> bool:
+        # the commit-graph speeds up the walks of git log --follow (filepath)
+        # and of the tags (only_releases). Writing it modifies the repository:
+        # only the clones of PyDriller get it by default
+        return os.environ.get('PYDRILLER_COMMIT_GRAPH') == '1' or \
+            (self._is_remote(path_repo) and
+             (self._conf.get('filepath') is not None or self._conf.get('only_releases')))
 
     @contextmanager
-    def _prep_repo(self, path_repo: str) -> Generator[Git, None, None]:
+    def _prep_repo(self, path_repo: str,
+                   clone: Optional[Tuple[str, Optional[tempfile.TemporaryDirectory]]] = None) -> Generator[Git, None, None]:
         local_path_repo = path_repo
-        if self._is_remote(path_repo):
-            local_path_repo = self._clone_remote_repo(self._clone_folder(), path_repo)
-        local_path_repo = str(Path(local_path_repo).expanduser().resolve())
+        tmp_dir = None
+        is_remote = self._is_remote(path_repo)
+        if is_remote:
+            local_path_repo, tmp_dir = clone if clone is not None else self._clone(path_repo)
+
+        # Git resolves the path (expanding "~"): reuse it, rather than
+        # resolving it twice
+        self.git = Git(local_path_repo, self._conf)
 
         # when multiple repos are given in input, this variable will serve as a reminder
         # of which one we are currently analyzing
-        self._conf.set_value('path_to_repo', local_path_repo)
+        self._conf.set_value('path_to_repo', str(self.git.path))
 
-        self.git = Git(local_path_repo, self._conf)
         # saving the Git object for further use
         self._conf.set_value("git", self.git)
 
         # checking that the filters are set correctly
         self._conf.sanity_check_filters()
-        yield self.git
 
-        # cleaning, this is necessary since GitPython issues on memory leaks
-        self._conf.set_value("git", None)
-        self.git.clear()
-        self.git = None  # type: ignore
+        if self._writes_commit_graph(path_repo):
+            self.git.write_commit_graph()
 
-        # delete the temporary directory if created
-        if self._is_remote(path_repo) and self._cleanup is True:
-            assert self._tmp_dir is not None
-            try:
-                self._tmp_dir.cleanup()
-            except (PermissionError, OSError):
-                # On Windows there might be cleanup errors.
-                # Manually remove files
-                shutil.rmtree(self._tmp_dir.name, ignore_errors=True)
+        try:
+            yield self.git
+        finally:
+            # also when the traversal is stopped early
+            # cleaning, this is necessary since GitPython issues on memory leaks
+            self._conf.set_value("git", None)
+            self.git.clear()
+            self.git = None  # type: ignore
+
+            # delete the temporary directory if created
+            if is_remote and self._cleanup is True:
+                assert tmp_dir is not None
+                self._cleanup_tmp_dir(tmp_dir)
+
+    @staticmethod
+    def _cleanup_tmp_dir(tmp_dir: tempfile.TemporaryDirectory) -> None:
+        try:
+            tmp_dir.cleanup()
+        except (PermissionError, OSError):
+            # On Windows there might be cleanup errors.
+            # Manually remove files
+            shutil.rmtree(tmp_dir.name, ignore_errors=True)
+
+    @classmethod
+    def _cleanup_prepared(cls, future: concurrent.futures.Future) -> None:
+        # a repo prepared, but never analyzed: delete its clone
+        if future.cancelled() or future.exception() is not None:
+            return
+        tmp_dir = future.result()[1]
+        if tmp_dir is not None:
+            cls._cleanup_tmp_dir(tmp_dir)
 
     def traverse_commits(self) -> Generator[Commit, None, None]:
         """
         Analyze all the specified commits (all of them by default), returning
         a generator of commits.
         """
-        for path_repo in self._conf.get('path_to_repos'):
-            with self._prep_repo(path_repo=path_repo) as git:
-                logger.info(f'Analyzing git repository in {git.path}')
-
-                # Get the commits that modified the filepath. In this case, we can not use
-                # git rev-list since it doesn't have the option --follow, necessary to follow
-                # the renames. Hence, we manually call git log instead
-                if self._conf.get('filepath') is not None:
-                    self._conf.set_value(
-                        'filepath_commits',
-                        git.get_commits_modified_file(self._conf.get('filepath'),
-                                                      self._conf.get('include_deleted_files'))
-                    )
-
-                # Gets only the commits that are tagged
-                if self._conf.get('only_releases'):
-                    self._conf.set_value('tagged_commits', git.get_tagged_commits())
-
-                # Build the arguments to pass to git rev-list.
-                rev, kwargs = self._conf.build_args()
-
-                with concurrent.futures.ThreadPoolExecutor(max_workers=self._conf.get("num_workers")) as executor:
-                    for job in executor.map(self._iter_commits, git.get_list_commits(rev, **kwargs)):
-
-                        for commit in job:
-                            yield commit
+        path_to_repos = self._conf.get('path_to_repos')
+        repo_workers = self._conf.get('repo_workers')
+        prepared: Dict[int, concurrent.futures.Future] = {}
+        prepare_executor = concurrent.futures.ThreadPoolExecutor(max_workers=repo_workers)
+        try:
+            for i, path_repo in enumerate(path_to_repos):
+                # the repos are independent: prepare the next ones while this
+                # one is analyzed. The commits, instead, are yielded one repo
+                # at a time, as they read the repo under analysis
+                if repo_workers > 1 and len(path_to_repos) > 1:
+                    for j in range(i, min(i + repo_workers, len(path_to_repos))):
+                        if j not in prepared:
+                            prepared[j] = prepare_executor.submit(self._prepare, path_to_repos[j])
+
+                yield from self._traverse_repo(path_repo, prepared.pop(i, None))
+        finally:
+            # e.g. the traversal is stopped early: do not wait for the next
+            # repos. The ones already being cloned are deleted once done
+            for future in prepared.values():
+                if not future.cancel():
+                    future.add_done_callback(self._cleanup_prepared)
+            prepare_executor.shutdown(wait=False)
+
+    async def atraverse_commits(self) -> AsyncGenerator[Commit, None]:
+        """
+        As traverse_commits(), but returning an asynchronous generator of
+        commits: the blocking work (cloning the repos, running git, deleting
+        the temporary folders) runs in the default executor of the event
+        loop, instead of blocking it.
+        """
+        # imported here, as most users never need it
+        import asyncio
+
+        loop = asyncio.get_event_loop()
+        commits = self.traverse_commits()
+        try:
+            while True:
+                commit = await loop.run_in_executor(None, next, commits, None)
+                if commit is None:
+                    return
+                yield commit
+        finally:
+            # e.g. the traversal is stopped early: clean up the repo as well
+            await loop.run_in_executor(None, commits.close)
+
+    def _traverse_repo(self, path_repo: str,
+                       prepared: Optional[concurrent.futures.Future]) -> Generator[Commit, None, None]:
+        clone = None
+        filepath_commits = None
+        if prepared is not None:
+            local_path_repo, tmp_dir, filepath_commits = prepared.result()
+            clone = (local_path_repo, tmp_dir)
+
+        with self._prep_repo(path_repo, clone) as git:
+            logger.info(f'Analyzing git repository in {git.path}')
+
+            # Get the commits that modified the filepath. In this case, we can not use
+            # git rev-list since it doesn't have the option --follow, necessary to follow
+            # the renames. Hence, we manually call git log instead
+            if self._conf.get('filepath') is not None:
+                if filepath_commits is None:
+                    filepath_commits = git.get_commits_modified_file(self._conf.get('filepath'),
+                                                                     self._conf.get('include_deleted_files'))
+                self._conf.set_value('filepath_commits', set(filepath_commits))
+
+            # Gets only the commits that are tagged
+            if self._conf.get('only_releases'):
+                self._conf.set_value('tagged_commits', set(git.get_tagged_commits()))
+
+            # Build the arguments to pass to git rev-list.
+            rev, kwargs = self._conf.build_args()
+
+            # the commits filtered by hash are skipped before being parsed, and
+            # git lists only the ones modifying paths of the selected types (a
+            # superset: the types are then checked on the full diff, with the
+            # renames)
+            # (only_releases already simplifies the history to the tags, and
+            # with single, "-n 1" would list the nearest ancestor modifying them)
+            paths = None if self._conf.get('only_releases') or self._conf.get('single') is not None \
+                else self._conf.get_file_type_pathspecs()
+            commits = git.get_list_commits(rev, self._conf.get_selected_commits(), paths, **kwargs)
+            if self._conf.get('filepath_commits') is not None:
+                commits = self._until_filepath_commits(commits)
+
+            num_workers = self._conf.get("num_workers")
+            with concurrent.futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
+                for job in self._map_in_window(executor, self._iter_commits, commits, num_workers, 16):
+
+                    for commit in job:
+                        yield commit
 
     def _iter_commits(self, commit: Commit) -> Generator[Commit, None, None]:
-        logger.info(f'Commit #{commit.hash} in {commit.committer_date} from {commit.author.name}')
+        # logged for every commit: at the debug level, so that following the
+        # progress of the repos (at the info level) does not format them
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug(f'Commit #{commit.hash} in {commit.committer_date} from {commit.author.name}')
 
         if self._conf.is_commit_filtered(commit):
-            logger.info(f'Commit #{commit.hash} filtered')
+            if debug:
+                logger.debug(f'Commit #{commit.hash} filtered')
             return
 
         yield commit
 
     @staticmethod
-    def _split_in_chunks(full_list: List[Commit], num_workers: int) -> List[List[Commit]]:
-        """
-        Given the list of commits return chunks of commits based on the number of workers.
+    def _map_in_window(executor: concurrent.futures.Executor, fn: Callable[[Commit], Any], commits: Iterable[Commit],
+                       num_workers: int, chunksize: int, ordered: bool = False) -> Generator[Any, None, None]:
+        # as executor.map(), but submitting at most 4 chunks of commits per
+        # worker ahead of the ones yielded: executor.map() submits them all
+        # at once, which keeps the whole history in memory. A future per
+        # chunk, rather than per commit, also cuts the bookkeeping of the
+        # executor.
+        chunks = Repository._chunks(commits, num_workers, chunksize)
+        if ordered or num_workers == 1:
+            # keep the order of the commits (a single worker keeps it anyway)
+            futures: Deque[concurrent.futures.Future] = deque()
+            for chunk in chunks:
+                futures.append(executor.submit(Repository._map_chunk, fn, chunk))
+                if len(futures) >= 4 * num_workers:
+                    yield from futures.popleft().result()
+
+            while futures:
+                yield from futures.popleft().result()
+            return
 
-        :param List[Commit] full_list: full list of commits
-        :param int num_workers: number of workers (i.e., threads)
-        :return: Chunks of commits
-        """
-        num_chunks = math.ceil(len(full_list) / num_workers)
-        chunks = []
-        for i in range(0, len(full_list), num_chunks):
-            chunks.append(full_list[i:i + num_chunks])
+        # the order is not kept anyway: yield the chunks as they complete,
+        # so that a slow one (e.g. a huge commit) does not hold back the
+        # ones after it, nor the submission of new ones
+        pending: Set[concurrent.futures.Future] = set()
+        for chunk in chunks:
+            pending.add(executor.submit(Repository._map_chunk, fn, chunk))
+            if len(pending) >= 4 * num_workers:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
 
-        return chunks
+        for future in concurrent.futures.as_completed(pending):
+            yield from future.result()
 
     @staticmethod
-    def _get_repo_name_from_url(url: str) -> str:
-        last_slash_index = url.rfind("/")
-        len_url = len(url)
+    def _chunks(commits: Iterable[Commit], num_workers: int, chunksize: int) -> Generator[List[Commit], None, None]:
+        # the chunks grow from 1 to `chunksize` commits, doubling every
+        # `num_workers` chunks: short histories are still spread across all
+        # the workers, rather than in a few full chunks
+        commits = iter(commits)
+        size = 1
+        for i in count(1):
+            chunk = list(islice(commits, size))
+            if not chunk:
+                return
+            yield chunk
+            if i % num_workers == 0:
+                size = min(chunksize, 2 * size)
 
-        if last_slash_index < 0 or last_slash_index >= len_url - 1:
-            raise MalformedUrl(f"Badly formatted url {url}")
+    @staticmethod
+    def _map_chunk(fn: Callable[[Commit], Any], chunk: List[Commit]) -> List[Any]:
+        return [fn(commit) for commit in chunk]
+
+    def _until_filepath_commits(self, commits: Iterable[Commit]) -> Generator[Commit, None, None]:
+        # the commits that modified the filepath are known up front: once
+        # all of them are reached, the remaining commits would be filtered
+        # anyway (e.g. the ones before the file was added), so stop there
+        remaining = set(self._conf.get('filepath_commits'))
+        remaining.discard('')
+        if not remaining:
+            return
 
-        last_dot_index = url.rfind(".")
+        for commit in commits:
+            yield commit
+            remaining.discard(commit.hash)
+            if not remaining:
+                return
 
-        if url[last_dot_index:] == ".git":
-            last_suffix_index = last_dot_index
-        else:
-            last_suffix_index = len_url
+    @staticmethod
+    def _get_repo_name_from_url(url: str) -> str:
+        # scp-like urls (git@host:user/repo.git) have no scheme
+        path = urlsplit(url).path if '://' in url else url.split(':', 1)[-1]
+        name = PurePosixPath(path).name
+        if name.endswith('.git'):
+            name = name[:-len('.git')]
+
+        if not name:
+            raise MalformedUrl(f"Badly formatted url {url}")
 
-        return url[last_slash_index + 1:last_suffix_index]
+        return name
 
 
 class MalformedUrl(Exception):
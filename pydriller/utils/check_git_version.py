@@ -1,6 +1,9 @@
 import subprocess
 import re
 
+# compiled once, with the major and minor numbers as groups
+_VERSION_NUMBER = re.compile(r"([0-9]+)\.([0-9]+)")
+
 
 class GitVersion(Exception):
     def __init__(self, message):
@@ -12,8 +15,12 @@ class CheckGitVersion:
         git_version = (
             subprocess.check_output(["git", "--version"]).decode("ascii").strip()
         )
-        version_number = re.findall(r"[0-9]+\.[0-9]+", git_version)[0]
-        if float(version_number) < 2.38:
+        match = _VERSION_NUMBER.search(git_version)
+        if match is None:
+            raise GitVersion(f"Could not read the version of git from '{git_version}'.")
+        version_number = match.group(0)
+        # compared as numbers, rather than as a float: 2.100 is newer than 2.38
+        if (int(match.group(1)), int(match.group(2))) < (2, 38):
             raise GitVersion(
                 f"Current git version is {version_number}. Minimum supported version is 2.38."
             )
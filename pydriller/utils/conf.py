@@ -3,10 +3,10 @@ Configuration module.
 """
 
 import logging
-from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple, Union
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 
-import pytz
 from gitdb.exc import BadName
 
 from pydriller.domain.commit import Commit
@@ -25,11 +25,15 @@ class Conf:
 
     def __init__(self, options: Dict[str, Any]) -> None:
         # insert all the configurations in a local dictionary
-        self._options = {}
-        for key, val in options.items():
-            self._options[key] = val
+        self._options = dict(options)
 
         self._sanity_check_repos(self.get('path_to_repo'))
+        self._sanity_check_diff_algorithm(self.get('diff_algorithm'))
+        # the checks not depending on the repo are done once, rather than
+        # for every repo analyzed
+        self._check_only_one_from_commit()
+        self._check_only_one_to_commit()
+        self._check_timezones()
         if isinstance(self.get('path_to_repo'), str):
             self.set_value('path_to_repos', [self.get('path_to_repo')])
         else:
@@ -40,6 +44,15 @@ class Conf:
         else:
             self.set_value("developer_factory", DefaultDeveloperFactory())
 
+        # matched against the modified files of every commit: built once
+        file_types = self._options.get('only_modifications_with_file_types')
+        self._file_types = None if file_types is None else tuple(file_types)
+        # used by git rev-list only to skip the commits touching no path of
+        # these types: the wildcards of the types themselves are escaped, so
+        # that no commit passing the suffix check is skipped
+        self._file_type_pathspecs = None if file_types is None else \
+            tuple('*' + re.sub(r'([*?[\\])', r'\\\1', file_type) for file_type in file_types)
+
     def set_value(self, key: str, value: Any) -> None:
         """
         Save the value of a configuration.
@@ -69,6 +82,17 @@ class Conf:
         if not isinstance(path_to_repo, str) and not isinstance(path_to_repo, list):
             raise Exception("The path to the repo has to be of type 'string' or 'list of strings'!")
 
+    @staticmethod
+    def _sanity_check_diff_algorithm(diff_algorithm: Optional[str]) -> None:
+        """
+        Checks if the diff algorithm is one of the algorithms of git.
+
+        @param diff_algorithm: diff algorithm as provided by the user.
+        @return:
+        """
+        if diff_algorithm not in (None, 'myers', 'minimal', 'patience', 'histogram'):
+            raise Exception("The diff algorithm has to be one of 'myers', 'minimal', 'patience' or 'histogram'!")
+
     def _check_only_one_from_commit(self) -> None:
         if not self.only_one_filter([self.get('since'),
                                      self.get('since_as_filter'),
@@ -88,9 +112,6 @@ class Conf:
 
         """
         self._check_correct_filters_order()
-        self._check_only_one_from_commit()
-        self._check_only_one_to_commit()
-        self._check_timezones()
 
         # Check if from_commit and to_commit point to the same commit, in which case
         # we remove both filters and use the "single" filter instead. This prevents
@@ -189,6 +210,19 @@ class Conf:
                                 "not exist".format(self.get('to_commit')))
         return None
 
+    def get_selected_commits(self) -> Optional[Set[str]]:
+        """
+        Get the hashes of the commits that can pass the 'only_commits',
+        'filepath' and 'only_releases' filters (None if none of them is
+        set): the other commits can be skipped as soon as they are listed.
+        """
+        selected = None
+        for key in ('only_commits', 'filepath_commits', 'tagged_commits'):
+            hashes = self.get(key)
+            if hashes is not None:
+                selected = set(hashes) if selected is None else selected & hashes
+        return selected
+
     @staticmethod
     def only_one_filter(arr: List[Any]) -> bool:
         """
@@ -267,6 +301,11 @@ class Conf:
         if until is not None:
             kwargs['until'] = until
 
+        if self.get('only_releases'):
+            # git lists only the commits pointed by a ref (the tags among
+            # them), rather than the whole history to be filtered
+            kwargs['simplify-by-decoration'] = True
+
         return rev, kwargs
 
     def is_commit_filtered(self, commit: Commit):
@@ -278,24 +317,43 @@ class Conf:
         :param Commit commit: Commit to check
         :return:
         """
-        if self.get('only_modifications_with_file_types') is not None:
-            if not self._has_modification_with_file_type(commit):
-                logger.debug('Commit filtered for modification types')
-                return True
-        if self.get('only_commits') is not None and commit.hash not in self.get('only_commits'):
+        # called for every commit: each option is read once
+        options = self._options
+        only_commits = options.get('only_commits')
+        if only_commits is not None and commit.hash not in only_commits:
             logger.debug("Commit filtered because it is not one of the specified commits")
             return True
-        if self.get('filepath_commits') is not None and commit.hash not in self.get('filepath_commits'):
+        filepath_commits = options.get('filepath_commits')
+        if filepath_commits is not None and commit.hash not in filepath_commits:
             logger.debug("Commit filtered because it did not modify the specified file")
             return True
-        if self.get('tagged_commits') is not None and commit.hash not in self.get('tagged_commits'):
+        tagged_commits = options.get('tagged_commits')
+        if tagged_commits is not None and commit.hash not in tagged_commits:
             logger.debug("Commit filtered because it is not tagged")
             return True
+        # last, as it diffs the commit: the hashes are checked first
+        if options.get('only_modifications_with_file_types') is not None:
+            if not self._has_modification_with_file_type(commit):
+                logger.debug('Commit filtered for modification types')
+                return True
         return False
 
+    def get_file_type_pathspecs(self) -> Optional[List[str]]:
+        """
+        Get the git pathspecs matching the files of the
+        'only_modifications_with_file_types' filter (None if it is not set).
+        """
+        if self._file_type_pathspecs is None:
+            return None
+        return list(self._file_type_pathspecs)
+
     def _has_modification_with_file_type(self, commit: Commit) -> bool:
+        assert self._file_types is not None
+        # on all the modified files: restricted to the file types, git would
+        # not detect the renames to other types (e.g. a.py -> a.txt would be
+        # seen as a deletion of a.py)
         for mod in commit.modified_files:
-            if mod.filename.endswith(tuple(self.get('only_modifications_with_file_types'))):
+            if mod.filename.endswith(self._file_types):
                 return True
         return False
 
@@ -310,5 +368,5 @@ class Conf:
     @staticmethod
     def _replace_timezone(dt: datetime) -> datetime:
         if dt.tzinfo is None or dt.tzinfo.utcoffset(dt) is None:
-            dt = dt.replace(tzinfo=pytz.utc)
+            dt = dt.replace(tzinfo=timezone.utc)
         return dt
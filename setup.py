@@ -38,6 +38,7 @@ setup(
     package_dir={'pydriller': 'pydriller'},
     python_requires='>=3.5',
     install_requires=requirements,
+    extras_require={'pygit2': ['pygit2']},
     tests_require=requirements + test_requirements,
     classifiers=[
             # How mature is this project? Common values are
@@ -13,8 +13,14 @@
 # limitations under the License.
 
 import logging
+import os
+import shutil
+from pathlib import Path
 from datetime import datetime, timezone, timedelta
+from unittest.mock import patch
+from pydriller.git import Git
 from pydriller.repository import Repository
+from pydriller.utils.conf import Conf
 from git import Repo
 
 import pytest
@@ -40,6 +46,53 @@ def test_mod_with_file_types():
     assert lc[1].hash == '0577bec2387ee131e1ccf336adcc172224d3f6f9'
 
 
+@pytest.fixture
+def renamed_file_repo(tmp_path):
+    # commit 1 adds a.py, commit 2 renames it to a.txt
+    with Repo.init(str(tmp_path)) as repo:
+        repo.git.config('user.name', 'pydriller')
+        repo.git.config('user.email', 'pydriller@example.com')
+        (tmp_path / 'a.py').write_text('print("a")\n')
+        repo.git.add('a.py')
+        repo.git.commit('-m', '1')
+        repo.git.mv('a.py', 'a.txt')
+        repo.git.commit('-m', '2')
+    return str(tmp_path)
+
+
+def test_mod_with_file_types_and_rename(renamed_file_repo):
+    # the rename is detected on all the modified files of the commit, also
+    # when git does not prefilter the commits
+    with patch.object(Conf, 'get_file_type_pathspecs', return_value=None):
+        lc = list(Repository(renamed_file_repo, only_modifications_with_file_types=['.py']).traverse_commits())
+        assert [commit.msg for commit in lc] == ['1']
+
+        lc = list(Repository(renamed_file_repo, only_modifications_with_file_types=['.txt']).traverse_commits())
+        assert [commit.msg for commit in lc] == ['2']
+
+
+def test_mod_with_file_types_prefiltered_by_git(renamed_file_repo):
+    with Repo(renamed_file_repo) as repo:
+        (Path(renamed_file_repo) / 'b[1].py').write_text('print("b")\n')
+        repo.git.add('--', ':(literal)b[1].py')
+        repo.git.commit('-m', '3')
+
+    # git lists both commits touching a .py path: the rename to a.txt is
+    # then filtered on the full diff, as without the pathspecs
+    with patch.object(Conf, 'is_commit_filtered', autospec=True,
+                      side_effect=Conf.is_commit_filtered) as is_commit_filtered:
+        lc = list(Repository(renamed_file_repo, only_modifications_with_file_types=['.py']).traverse_commits())
+    assert [commit.msg for commit in lc] == ['1', '3']
+    assert is_commit_filtered.call_count == 3
+
+    lc = list(Repository(renamed_file_repo, only_modifications_with_file_types=['.txt']).traverse_commits())
+    assert [commit.msg for commit in lc] == ['2']
+
+    # the wildcards of the types are matched literally
+    lc = list(Repository(renamed_file_repo, only_modifications_with_file_types=['[1].py']).traverse_commits())
+    assert [commit.msg for commit in lc] == ['3']
+
+
 def test_mod_with_file_types_no_extension():
     lc = list(Repository('test-repos/different_files',
                          only_modifications_with_file_types=['.py'])
@@ -62,6 +115,34 @@ def test_mod_with_file_types_and_date():
     assert lc[0].hash == 'b8c2be250786975f1c6f47e96922096f1bb25e39'
 
 
+def test_mod_with_file_types_and_single():
+    # the commit modifies no .md file: it is filtered, rather than replaced
+    # by its nearest ancestor modifying one
+    lc = list(Repository('test-repos/pydriller',
+                         single='e0a95f2ad45d015f0a338fdffc581002ccfab746',
+                         only_modifications_with_file_types=['.md']).traverse_commits())
+    assert lc == []
+
+    lc = list(Repository('test-repos/pydriller',
+                         single='e0a95f2ad45d015f0a338fdffc581002ccfab746',
+                         only_modifications_with_file_types=['.yml']).traverse_commits())
+    assert [commit.hash for commit in lc] == ['e0a95f2ad45d015f0a338fdffc581002ccfab746']
+
+
+def test_mod_with_file_types_and_only_commits():
+    with patch.object(Conf, 'get_selected_commits', return_value=None), \
+            patch.object(Conf, '_has_modification_with_file_type', autospec=True,
+                         side_effect=Conf._has_modification_with_file_type) as has_modification:
+        lc = list(Repository('test-repos/small_repo',
+                             only_modifications_with_file_types=['.java'],
+                             only_commits=['6411e3096dd2070438a17b225f44475136e54e3a'])
+                  .traverse_commits())
+
+    assert [commit.hash[:7] for commit in lc] == ['6411e30']
+    # the other commits are filtered by hash, without being diffed
+    assert has_modification.call_count == 1
+
+
 def test_only_in_main_branch():
     lc = list(Repository('test-repos/branches_not_merged').traverse_commits())
 
@@ -286,6 +367,16 @@ def test_only_releases():
     assert '627e1ad917a188a861c9fedf6e5858b79edbe439' == lc[2].hash
 
 
+def test_only_releases_skips_untagged_commits():
+    with patch.object(Conf, 'is_commit_filtered', autospec=True,
+                      side_effect=Conf.is_commit_filtered) as is_commit_filtered:
+        lc = list(Repository('test-repos/tags', only_releases=True).traverse_commits())
+
+    assert len(lc) == 3
+    # the two untagged commits are not listed by git
+    assert is_commit_filtered.call_count == 3
+
+
 def test_only_releases_wo_releases():
     lc = list(Repository('test-repos/complex_repo', only_releases=True).traverse_commits())
 
@@ -398,3 +489,36 @@ def test_include_remotes():
     # Set include_remotes=True and assert that the commit is now found
     commits_with_remotes = [commit.hash for commit in Repository('test-repos/pydriller/', include_remotes=True).traverse_commits()]
     assert '2fa0d8c57829b086c9372722115a89d11c9bdd35' in commits_with_remotes
+
+
+def test_filepath_stops_after_last_commit():
+    with patch.object(Conf, 'is_commit_filtered', autospec=True,
+                      side_effect=Conf.is_commit_filtered) as is_commit_filtered:
+        commits = list(Repository(
+            path_to_repo='test-repos/small_repo',
+            filepath='file2.java').traverse_commits())
+
+    assert [commit.hash[:7] for commit in commits] == ['a88c84d', '6411e30', '09f6182']
+    # the two newer commits are not walked
+    assert is_commit_filtered.call_count == 3
+
+
+def test_commit_graph(tmp_path, monkeypatch):
+    path_to_repo = str(tmp_path / 'small_repo')
+    shutil.copytree('test-repos/small_repo', path_to_repo)
+    commit_graph = os.path.join(path_to_repo, '.git', 'objects', 'info', 'commit-graph')
+    if os.path.exists(commit_graph):
+        # written by git gc in the other tests
+        os.remove(commit_graph)
+
+    list(Repository(path_to_repo, filepath='file4.java').traverse_commits())
+    assert not os.path.exists(commit_graph)
+
+    monkeypatch.setenv('PYDRILLER_COMMIT_GRAPH', '1')
+    # the loose objects are packed as well
+    monkeypatch.setattr('pydriller.git._MAX_LOOSE_OBJECTS', 0)
+    assert Git(path_to_repo)._count_loose_objects() > 0
+    commits = list(Repository(path_to_repo, filepath='file4.java').traverse_commits())
+    assert os.path.exists(commit_graph)
+    assert Git(path_to_repo)._count_loose_objects() == 0
+    assert len(commits) == 2
@@ -12,7 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from unittest.mock import patch
+
 from pydriller.repository import Repository
+from pydriller.utils.conf import Conf
 from datetime import datetime, timezone, timedelta
 import logging
 import pytest
@@ -241,3 +244,15 @@ def test_multiple_filters_exceptions():
                                  to=dt1,
                                  to_tag=from_tag).traverse_commits():
             print(commit.hash)
+
+
+def test_filters_checked_once():
+    # the checks not depending on the repo fail before any repo is opened
+    with pytest.raises(Exception):
+        Repository('test-repos/small_repo/', since=dt1, from_tag='v1.4')
+
+    with patch.object(Conf, '_check_timezones', autospec=True, side_effect=Conf._check_timezones) as check_timezones:
+        lc = list(Repository(['test-repos/small_repo/', 'test-repos/small_repo/'], since=dt1).traverse_commits())
+
+    assert len(lc) == 2 * len(list(Repository('test-repos/small_repo/', since=dt1).traverse_commits()))
+    assert check_timezones.call_count == 1
@@ -0,0 +1,84 @@
+import pytest
+from git import Git, Repo
+from mock import patch
+
+from pydriller import Repository
+from pydriller.metrics.process.cache import MetricsCache
+from pydriller.metrics.process.code_churn import CodeChurn
+from pydriller.metrics.process.commits_count import CommitsCount
+
+FROM_COMMIT = 'ab36bf45859a210b0eae14e17683f31d19eea041'
+TO_COMMIT = 'fdf671856b260aca058e6595a96a7a0fba05454b'
+
+
+def test_get_and_set(tmp_path):
+    cache = MetricsCache(str(tmp_path))
+    with pytest.raises(KeyError):
+        cache.get(('key',))
+
+    cache.set(('key',), {'file.py': 3})
+    assert cache.get(('key',)) == {'file.py': 3}
+
+    # the cache is persisted on disk
+    assert MetricsCache(str(tmp_path)).get(('key',)) == {'file.py': 3}
+
+
+def test_least_recently_used_are_evicted(tmp_path):
+    cache = MetricsCache(str(tmp_path), max_entries=2)
+    cache.set(('a',), 1)
+    cache.set(('b',), 2)
+    cache.get(('a',))
+    cache.set(('c',), 3)
+
+    assert cache.get(('a',)) == 1
+    assert cache.get(('c',)) == 3
+    with pytest.raises(KeyError):
+        cache.get(('b',))
+
+
+def test_metric_results_are_cached(tmp_path):
+    cache = MetricsCache(str(tmp_path))
+    expected = CommitsCount('test-repos/pydriller', from_commit=FROM_COMMIT, to_commit=TO_COMMIT).count()
+    assert CommitsCount('test-repos/pydriller', from_commit=FROM_COMMIT, to_commit=TO_COMMIT, cache=cache).count() == expected
+
+    with patch.object(Repository, 'traverse_commits') as traverse_commits:
+        metric = CommitsCount('test-repos/pydriller', from_commit=FROM_COMMIT, to_commit=TO_COMMIT, cache=cache)
+        assert metric.count() == expected
+
+    assert traverse_commits.call_count == 0
+
+
+def test_metric_options_are_part_of_the_key(tmp_path):
+    cache = MetricsCache(str(tmp_path))
+    churn = CodeChurn('test-repos/pydriller', from_commit=FROM_COMMIT, to_commit=TO_COMMIT, cache=cache)
+    churn_with_deleted_lines = CodeChurn('test-repos/pydriller', from_commit=FROM_COMMIT, to_commit=TO_COMMIT,
+                                         add_deleted_lines_to_churn=True, cache=cache)
+
+    assert churn.count() == CodeChurn('test-repos/pydriller', from_commit=FROM_COMMIT, to_commit=TO_COMMIT).count()
+    assert churn_with_deleted_lines.count() != churn.count()
+
+
+def test_moved_branch_is_a_miss(tmp_path):
+    path = str(tmp_path / 'repo')
+    Repo.clone_from('test-repos/pydriller', path).close()
+    cache = MetricsCache(str(tmp_path / 'cache'))
+    git = Git(path)
+    git.branch('period', TO_COMMIT)
+
+    def count():
+        return CommitsCount(path, from_commit=FROM_COMMIT, to_commit='period', cache=cache).count()
+
+    count()
+    # the branch moves, while HEAD does not
+    git.branch('-f', 'period', FROM_COMMIT)
+    assert count() == CommitsCount(path, from_commit=FROM_COMMIT, to_commit=FROM_COMMIT).count()
+
+
+def test_key_does_not_open_a_repo(tmp_path):
+    metric = CommitsCount('test-repos/pydriller', from_commit=FROM_COMMIT, to_commit=TO_COMMIT,
+                          cache=MetricsCache(str(tmp_path)))
+    with patch('pydriller.metrics.process.process_metric.Repo') as repo:
+        key = metric._cache_key()
+
+    assert repo.call_count == 0
+    assert FROM_COMMIT in key and TO_COMMIT in key
@@ -0,0 +1,38 @@
+import pytest
+
+from pydriller import ModificationType, Repository
+from pydriller.metrics.process.diff_tree import get_commits_modifying_file, get_modified_files
+
+TEST_DATA = [
+    ('test-repos/small_repo', None),
+    # renames
+    ('test-repos/pydriller', '4be0402d466470ae7274c4244bad2712dfeda3ab'),
+    # empty files
+    ('test-repos/pydriller', '0898472a86742c98ec409871a65946db58c530be'),
+    # binary files
+    ('test-repos/pydriller', 'acc904ce560745f86991e960e06ef4c595c2fed3'),
+]
+
+
+def _summary(modified_file):
+    return (modified_file.old_path, modified_file.new_path, modified_file.change_type,
+            modified_file.added_lines, modified_file.deleted_lines)
+
+
+@pytest.mark.parametrize('path_to_repo, single', TEST_DATA)
+def test_get_modified_files(path_to_repo, single):
+    for commit in Repository(path_to_repo, single=single).traverse_commits():
+        expected = sorted(map(_summary, commit.modified_files), key=str)
+        assert sorted(map(_summary, get_modified_files(commit)), key=str) == expected
+
+
+def test_get_commits_modifying_file():
+    commits = list(Repository('test-repos/small_repo', filepath='file4.java', order='reverse').traverse_commits())
+    modified_files = [list(map(_summary, files)) for _, files in get_commits_modifying_file(commits, 'file4.java')]
+
+    # the commits adding or deleting a path of the file are diffed in full,
+    # to detect the renames: file1.java is then followed in the older commit
+    assert modified_files == [
+        [('file1.java', 'file4.java', ModificationType.RENAME, 0, 3)],
+        [(None, 'file1.java', ModificationType.ADD, 63, 0), (None, 'file2.java', ModificationType.ADD, 128, 0)],
+    ]
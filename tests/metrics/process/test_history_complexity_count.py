@@ -52,3 +52,17 @@ def test_with_dates(path_to_repo, filepath, since, to, expected):
     count = metric.count()
     filepath = str(Path(filepath))
     assert count[filepath] == expected
+
+
+@pytest.mark.parametrize('num_workers', [1, 2])
+def test_count_periods(num_workers):
+    periods = [('71e053f61fc5d31b3e31eccd9c79df27c31279bf', '90ca34ebfe69629cb7f186a1582fc38a73cc572e'),
+               ('fdf671856b260aca058e6595a96a7a0fba05454b', 'ab36bf45859a210b0eae14e17683f31d19eea041')]
+    hcpfs = [HistoryComplexity('test-repos/pydriller', from_commit=from_commit, to_commit=to_commit).count()
+             for from_commit, to_commit in periods]
+
+    hcm = HistoryComplexity.count_periods('test-repos/pydriller', periods, num_workers=num_workers)
+
+    assert set(hcm) == set(hcpfs[0]) | set(hcpfs[1])
+    for filepath, value in hcm.items():
+        assert value == round(sum(hcpf.get(filepath, 0) for hcpf in hcpfs), 2)
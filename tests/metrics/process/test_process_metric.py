@@ -1,7 +1,23 @@
+import importlib.util
+import os
+import shutil
+import threading
 import pytest
 
 from datetime import datetime
-from pydriller.metrics.process.process_metric import ProcessMetric
+from mock import patch
+from pathlib import Path
+
+from git import Repo
+
+from pydriller import Repository
+from pydriller.metrics.process import process_metric
+from pydriller.metrics.process.code_churn import CodeChurn
+from pydriller.metrics.process.commits_count import CommitsCount
+from pydriller.metrics.process.contributors_count import ContributorsCount
+from pydriller.metrics.process.hunks_count import HunksCount
+from pydriller.metrics.process.lines_count import LinesCount
+from pydriller.metrics.process.process_metric import ProcessMetric, RenamedFiles
 
 dt1 = datetime(2016, 10, 8, 17, 0, 0)
 dt2 = datetime(2016, 10, 8, 17, 59, 0)
@@ -21,3 +37,262 @@ def test_type_error(path_to_repo, since, to, from_commit, to_commit):
                       to=to,
                       from_commit=from_commit,
                       to_commit=to_commit)
+
+
+def test_renamed_files_follow_rename_chain():
+    renamed_files = RenamedFiles()
+    assert renamed_files.find('a.py') == 'a.py'
+    assert renamed_files.find(None) is None
+
+    # traversal goes from the newest to the oldest commit
+    renamed_files.union('b.py', renamed_files.find('c.py'))
+    renamed_files.union('a.py', renamed_files.find('b.py'))
+    assert renamed_files.find('a.py') == 'c.py'
+    assert renamed_files.find('b.py') == 'c.py'
+
+    # a file renamed back to its original name is not its own alias
+    renamed_files.union('c.py', renamed_files.find('c.py'))
+    assert renamed_files.find('c.py') == 'c.py'
+
+
+def test_shared_traversal():
+    path_to_repo = 'test-repos/pydriller'
+    from_commit = 'fdf671856b260aca058e6595a96a7a0fba05454b'
+    to_commit = 'ab36bf45859a210b0eae14e17683f31d19eea041'
+    expected_churn = CodeChurn(path_to_repo, from_commit=from_commit, to_commit=to_commit).count()
+    expected_added = LinesCount(path_to_repo, from_commit=from_commit, to_commit=to_commit).count_added()
+
+    with patch.object(Repository, 'traverse_commits', autospec=True,
+                      side_effect=Repository.traverse_commits) as traverse_commits:
+        with ProcessMetric.shared_traversal():
+            churn = CodeChurn(path_to_repo, from_commit=from_commit, to_commit=to_commit).count()
+            # the same repository, passed with a different path
+            added = LinesCount(os.path.abspath(path_to_repo), from_commit=from_commit, to_commit=to_commit).count_added()
+
+    assert traverse_commits.call_count == 1
+    assert churn == expected_churn
+    assert added == expected_added
+    assert process_metric._SHARED_COMMITS.get() is None
+
+
+def test_nested_shared_traversal():
+    path_to_repo = 'test-repos/pydriller'
+    from_commit = 'fdf671856b260aca058e6595a96a7a0fba05454b'
+    to_commit = 'ab36bf45859a210b0eae14e17683f31d19eea041'
+
+    with patch.object(Repository, 'traverse_commits', autospec=True,
+                      side_effect=Repository.traverse_commits) as traverse_commits:
+        with ProcessMetric.shared_traversal():
+            CodeChurn(path_to_repo, from_commit=from_commit, to_commit=to_commit).count()
+            with ProcessMetric.shared_traversal():
+                LinesCount(path_to_repo, from_commit=from_commit, to_commit=to_commit).count_added()
+            # the traversal of the outer context is still shared
+            assert process_metric._SHARED_COMMITS.get()
+            CommitsCount(path_to_repo, from_commit=from_commit, to_commit=to_commit).count()
+
+    assert traverse_commits.call_count == 1
+    assert process_metric._SHARED_COMMITS.get() is None
+
+
+def test_shared_traversal_is_local_to_the_thread():
+    seen = []
+
+    def in_thread():
+        seen.append(process_metric._SHARED_COMMITS.get())
+        with ProcessMetric.shared_traversal():
+            pass
+
+    with ProcessMetric.shared_traversal():
+        shared_commits = process_metric._SHARED_COMMITS.get()
+        thread = threading.Thread(target=in_thread)
+        thread.start()
+        thread.join()
+        # the thread leaving its context does not end this one
+        assert process_metric._SHARED_COMMITS.get() is shared_commits
+
+    assert seen == [None]
+
+
+def test_num_workers():
+    path_to_repo = 'test-repos/pydriller'
+    from_commit = 'ab36bf45859a210b0eae14e17683f31d19eea041'
+    to_commit = 'fdf671856b260aca058e6595a96a7a0fba05454b'
+    metric = CodeChurn(path_to_repo, from_commit=from_commit, to_commit=to_commit)
+    threaded_metric = CodeChurn(path_to_repo, from_commit=from_commit, to_commit=to_commit, num_workers=4)
+
+    assert threaded_metric.count() == metric.count()
+    assert threaded_metric.max() == metric.max()
+
+
+def test_num_workers_with_diff():
+    path_to_repo = 'test-repos/pydriller'
+    from_commit = 'ab36bf45859a210b0eae14e17683f31d19eea041'
+    to_commit = '32f7680522bbaefced9db048d7395cb5c150c1fd'
+    metric = HunksCount(path_to_repo, from_commit=from_commit, to_commit=to_commit)
+    threaded_metric = HunksCount(path_to_repo, from_commit=from_commit, to_commit=to_commit, num_workers=2)
+
+    listed = []
+    original_traverse_commits = Repository.traverse_commits
+
+    def traverse_commits(self):
+        for commit in original_traverse_commits(self):
+            listed.append(commit)
+            yield commit
+
+    opened = []
+
+    def open_repo(path):
+        opened.append(Repo(path))
+        return opened[-1]
+
+    with patch('pydriller.metrics.process.process_metric.Repo', side_effect=open_repo), \
+            patch.object(Repo, 'close', autospec=True, side_effect=Repo.close) as close, \
+            patch.object(Repository, 'traverse_commits', traverse_commits):
+        commits = threaded_metric._diff_commits(threaded_metric.repo_miner)
+        next(commits)
+        # only a few chunks of commits are diffed ahead
+        assert len(listed) < 40
+        commits.close()
+
+    # the Repos of the worker threads are closed
+    assert 1 <= len(opened) <= 2
+    closed = [call.args[0] for call in close.call_args_list]
+    assert all(any(repo is closed_repo for closed_repo in closed) for repo in opened)
+
+    assert threaded_metric.count() == metric.count()
+
+
+@pytest.mark.parametrize('metric_class', [CodeChurn, CommitsCount, ContributorsCount, LinesCount])
+def test_filepath(metric_class):
+    path_to_repo = 'test-repos/pydriller'
+    from_commit = 'ab36bf45859a210b0eae14e17683f31d19eea041'
+    to_commit = '4236535f6ac44f4d9e0bb29b587b87201fc7c3d8'
+    # renamed twice in the evolution period
+    filepath = str(Path('pydriller/domain/commit.py'))
+    metric = metric_class(path_to_repo, from_commit=from_commit, to_commit=to_commit)
+    file_metric = metric_class(path_to_repo, from_commit=from_commit, to_commit=to_commit, filepath=filepath)
+
+    assert file_metric.count() == {filepath: metric.count()[filepath]}
+
+
+@pytest.mark.parametrize('metric_class', [CodeChurn, CommitsCount, ContributorsCount, HunksCount, LinesCount])
+def test_pygit2_backend(metric_class):
+    pytest.importorskip('pygit2')
+    path_to_repo = 'test-repos/pydriller'
+    from_commit = '980e94375b10e3e0342bb545981be55b2719c4fa'
+    to_commit = 'd68c94fcb85f0c7d763740eb73e5b57583f7c386'
+    metric = metric_class(path_to_repo, from_commit=from_commit, to_commit=to_commit)
+    pygit2_metric = metric_class(path_to_repo, from_commit=from_commit, to_commit=to_commit, backend='pygit2')
+
+    assert pygit2_metric.count() == metric.count()
+
+
+def test_same_lines_on_every_path():
+    path_to_repo = 'test-repos/pydriller'
+    commit = '156111a'
+    filepath = str(Path('docs/reference.rst'))
+    # the underline "--------" of a removed title is not counted, as in
+    # ModifiedFile.deleted_lines
+    expected = {filepath: 8}
+
+    def count_removed(**kwargs):
+        removed = LinesCount(path_to_repo, from_commit=commit, to_commit=commit, **kwargs).count_removed()
+        return {filepath: removed[filepath]}
+
+    assert count_removed() == expected
+    with ProcessMetric.shared_traversal():
+        HunksCount(path_to_repo, from_commit=commit, to_commit=commit).count()
+        assert count_removed() == expected
+    if importlib.util.find_spec('pygit2') is not None:
+        assert count_removed(backend='pygit2') == expected
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        CodeChurn('test-repos/pydriller', from_commit='ab36bf45859a210b0eae14e17683f31d19eea041',
+                  to_commit='4236535f6ac44f4d9e0bb29b587b87201fc7c3d8', backend='libgit')
+
+
+def test_shared_traversal_with_filepath():
+    path_to_repo = 'test-repos/pydriller'
+    from_commit = 'ab36bf45859a210b0eae14e17683f31d19eea041'
+    to_commit = '4236535f6ac44f4d9e0bb29b587b87201fc7c3d8'
+    filepaths = [str(Path('pydriller/domain/commit.py')), str(Path('pydriller/git_repository.py'))]
+    expected = [CommitsCount(path_to_repo, from_commit=from_commit, to_commit=to_commit, filepath=filepath).count()
+                for filepath in filepaths]
+
+    with patch.object(Repository, 'traverse_commits', autospec=True,
+                      side_effect=Repository.traverse_commits) as traverse_commits:
+        with ProcessMetric.shared_traversal():
+            counts = [CommitsCount(path_to_repo, from_commit=from_commit, to_commit=to_commit,
+                                   filepath=filepath).count()
+                      for filepath in filepaths]
+
+    assert traverse_commits.call_count == 1
+    assert counts == expected
+
+
+def test_shared_traversal_with_diff():
+    path_to_repo = 'test-repos/pydriller'
+    from_commit = 'fdf671856b260aca058e6595a96a7a0fba05454b'
+    to_commit = 'ab36bf45859a210b0eae14e17683f31d19eea041'
+    expected_hunks = HunksCount(path_to_repo, from_commit=from_commit, to_commit=to_commit).count()
+    expected_churn = CodeChurn(path_to_repo, from_commit=from_commit, to_commit=to_commit).count()
+
+    with patch.object(Repository, 'traverse_commits', autospec=True,
+                      side_effect=Repository.traverse_commits) as traverse_commits:
+        with ProcessMetric.shared_traversal():
+            hunks = HunksCount(path_to_repo, from_commit=from_commit, to_commit=to_commit).count()
+            churn = CodeChurn(path_to_repo, from_commit=from_commit, to_commit=to_commit).count()
+
+    assert traverse_commits.call_count == 1
+    assert hunks == expected_hunks
+    assert churn == expected_churn
+
+
+def test_commit_graph(tmp_path, monkeypatch):
+    path_to_repo = str(tmp_path / 'small_repo')
+    shutil.copytree('test-repos/small_repo', path_to_repo)
+    commit_graph = os.path.join(path_to_repo, '.git', 'objects', 'info', 'commit-graph')
+    if os.path.exists(commit_graph):
+        # written by git gc in the other tests
+        os.remove(commit_graph)
+    from_commit = 'a88c84ddf42066611e76e6cb690144e5357d132c'
+    to_commit = 'da39b1326dbc2edfe518b90672734a08f3c13458'
+
+    CommitsCount(path_to_repo, from_commit=from_commit, to_commit=to_commit)
+    assert not os.path.exists(commit_graph)
+
+    monkeypatch.setenv('PYDRILLER_COMMIT_GRAPH', '1')
+    count = CommitsCount(path_to_repo, from_commit=from_commit, to_commit=to_commit).count()
+    assert os.path.exists(commit_graph)
+    assert count == CommitsCount('test-repos/small_repo', from_commit=from_commit, to_commit=to_commit).count()
+
+
+@pytest.mark.parametrize('num_workers', [1, 2])
+def test_count_files(num_workers):
+    path_to_repo = 'test-repos/pydriller'
+    from_commit = 'ab36bf45859a210b0eae14e17683f31d19eea041'
+    to_commit = '4236535f6ac44f4d9e0bb29b587b87201fc7c3d8'
+    filepaths = [str(Path('pydriller/domain/commit.py')), str(Path('pydriller/git_repository.py'))]
+    count = CommitsCount(path_to_repo, from_commit=from_commit, to_commit=to_commit).count()
+
+    files = CommitsCount.count_files(path_to_repo, filepaths, num_workers=num_workers,
+                                     from_commit=from_commit, to_commit=to_commit)
+
+    assert files == {filepath: count[filepath] for filepath in filepaths}
+
+
+@pytest.mark.parametrize('filepath', ['pydriller/domain/commit.py', 'pydriller/git_repository.py'])
+def test_pygit2_backend_with_filepath(filepath):
+    pytest.importorskip('pygit2')
+    path_to_repo = 'test-repos/pydriller'
+    from_commit = 'ab36bf45859a210b0eae14e17683f31d19eea041'
+    to_commit = '4236535f6ac44f4d9e0bb29b587b87201fc7c3d8'
+    filepath = str(Path(filepath))
+    metric = CodeChurn(path_to_repo, from_commit=from_commit, to_commit=to_commit, filepath=filepath)
+    pygit2_metric = CodeChurn(path_to_repo, from_commit=from_commit, to_commit=to_commit, filepath=filepath,
+                              backend='pygit2')
+
+    assert pygit2_metric.count() == metric.count()
+    assert pygit2_metric.max() == metric.max()
@@ -11,6 +11,9 @@ import pytest
         ("3.2.0", does_not_raise()),
         ("2.38.1", does_not_raise()),
         ("2.0.0", pytest.raises(GitVersion)),
+        ("2.5.0", pytest.raises(GitVersion)),
+        ("2.100.0", does_not_raise()),
+        ("unknown", pytest.raises(GitVersion)),
     ],
 )
 def test_extracts_correct_version(version_number, expectation):
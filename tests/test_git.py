@@ -33,6 +33,24 @@ def test_projectname(repo: Git):
     assert repo.project_name == "small_repo"
 
 
+def test_absolute_path(tmp_path):
+    path = str(Path('test-repos/small_repo').resolve())
+    gr = Git(path + '/../small_repo/')
+    assert gr.path == Path(path)
+    assert gr.project_name == "small_repo"
+    gr.clear()
+
+    # the symlinks are resolved too, also before a ".."
+    (tmp_path / 'link').symlink_to(path, target_is_directory=True)
+    gr = Git(str(tmp_path / 'link' / '..' / 'small_repo'))
+    assert gr.path == Path(path)
+    gr.clear()
+    gr = Git(str(tmp_path / 'link'))
+    assert gr.path == Path(path)
+    assert gr.project_name == "small_repo"
+    gr.clear()
+
+
 @pytest.mark.parametrize('repo', ['test-repos/small_repo/'], indirect=True)
 def test_get_head(repo: Git):
     assert repo is not None
@@ -65,6 +83,27 @@ def test_list_commits(repo: Git):
     assert len(change_sets) == 5
 
 
+@pytest.mark.parametrize('repo', ['test-repos/pydriller/', 'test-repos/contentmine_mailmap/'], indirect=True)
+def test_list_commits_metadata(repo: Git):
+    # the metadata is read from rev-list: it must match the commit objects
+    for commit in repo.get_list_commits():
+        expected = repo.get_commit(commit.hash)
+
+        assert commit.msg == expected.msg
+        assert commit.author == expected.author
+        assert commit.committer == expected.committer
+        assert commit.author_date == expected.author_date
+        assert commit.committer_date == expected.committer_date
+        assert commit.author_timezone == expected.author_timezone
+        assert commit.committer_timezone == expected.committer_timezone
+        assert commit.parents == expected.parents
+        assert commit.co_authors == expected.co_authors
+
+    # the commits of the same author share its Actor
+    actors = [commit.author for commit in repo._iter_commits('HEAD')]
+    assert len({id(actor) for actor in actors}) == len(set(actors))
+
+
 @pytest.mark.parametrize('repo', ['test-repos/small_repo/'], indirect=True)
 def test_get_commit(repo: Git):
     c = repo.get_commit('09f6182cef737db02a085e1d018963c7a29bde5a')
@@ -524,3 +563,20 @@ def test_diff_function_in_git(repo: Git):
     assert "+        return new GitRepository(path).info();" in diff
     assert "     }" in diff
     assert "     public static SCMRepository singleProject(String path, boolean singleParentOnly) {" in diff
+
+
+@pytest.mark.parametrize('repo', ['test-repos/small_repo/'], indirect=True)
+def test_list_commits_with_hashes(repo: Git):
+    hashes = {'a88c84ddf42066611e76e6cb690144e5357d132c', 'da39b1326dbc2edfe518b90672734a08f3c13458', 'unknown'}
+    assert [commit.hash for commit in repo.get_list_commits(hashes=hashes)] == \
+        ['a88c84ddf42066611e76e6cb690144e5357d132c', 'da39b1326dbc2edfe518b90672734a08f3c13458']
+
+
+@pytest.mark.parametrize('repo', ['test-repos/pydriller/'], indirect=True)
+def test_list_commits_with_paths(repo: Git):
+    listed = {commit.hash for commit in repo.get_list_commits(paths=['*.md'])}
+    expected = {commit.hash for commit in repo.get_list_commits()
+                if any(mod.filename.endswith('.md') for mod in commit.modified_files)}
+    assert expected <= listed
+    # besides them, only merge commits are listed
+    assert all(repo.get_commit(commit_hash).merge for commit_hash in listed - expected)
@@ -1,8 +1,15 @@
+import asyncio
+import concurrent.futures
 import logging
 from datetime import datetime
+from pathlib import Path
 import os
 import pytest
+import shutil
 import sys
+import threading
+import time
+from unittest.mock import patch
 
 from pydriller import Repository, Git
 from pydriller.repository import MalformedUrl
@@ -279,6 +286,10 @@ def test_get_repo_name_from_url():
     url_set_b = [
         "https://github.com/ishepard/pydriller",
         "https://github.com/ishepard/pydriller.git",
+        "https://github.com/ishepard/pydriller/",
+        "git@github.com:ishepard/pydriller.git",
+        "git@github.com:pydriller.git",
+        "https://github.com/ishepard/pydriller.git?ref=master",
     ]
 
     for url in url_set_a:
@@ -287,6 +298,19 @@ def test_get_repo_name_from_url():
     for url in url_set_b:
         assert Repository._get_repo_name_from_url(url) == "pydriller"
 
+    with pytest.raises(MalformedUrl):
+        Repository._get_repo_name_from_url("https://github.com/ishepard/.git")
+
+
+def test_is_remote():
+    for url in ["https://github.com/ishepard/pydriller", "http://github.com/ishepard/pydriller",
+                "git@github.com:ishepard/pydriller.git", "ssh://git@github.com/ishepard/pydriller.git",
+                "git://github.com/ishepard/pydriller.git"]:
+        assert Repository._is_remote(url)
+        assert Repository._get_repo_name_from_url(url) == "pydriller"
+
+    assert not Repository._is_remote("test-repos/pydriller")
+
 
 @pytest.mark.skipif(sys.version_info < (3, 8) and sys.platform == "win32", reason="requires Python3.8 or greater on Windows")
 def test_deletion_remotes():
@@ -309,3 +333,217 @@ def test_deleted_files():
                    include_deleted_files=True).traverse_commits()
     )
     assert len(deleted_commits) > 0
+
+
+def test_traverse_commits_is_lazy():
+    listed = []
+
+    def get_list_commits(self, rev='HEAD', *args, **kwargs):
+        for commit in get_list_commits.original(self, rev, *args, **kwargs):
+            listed.append(commit.hash)
+            yield commit
+
+    get_list_commits.original = Git.get_list_commits
+    with patch.object(Git, 'get_list_commits', get_list_commits):
+        commits = Repository('test-repos/pydriller', num_workers=2).traverse_commits()
+        next(commits)
+        # only a window of 8 chunks of commits is listed ahead of the ones
+        # yielded
+        assert len(listed) <= 8 * 16
+        commits.close()
+
+
+def test_repo_workers():
+    local_repos = {
+        'https://example.com/small_repo.git': 'test-repos/small_repo',
+        'https://example.com/branches_merged.git': 'test-repos/branches_merged',
+    }
+    cloned = []
+    release = threading.Event()
+
+    def clone_remote_repo(self, tmp_folder, repo):
+        if repo.endswith('branches_merged.git'):
+            assert release.wait(5)
+        repo_folder = os.path.join(tmp_folder, self._get_repo_name_from_url(repo))
+        shutil.copytree(local_repos[repo], repo_folder)
+        cloned.append((repo_folder, threading.current_thread() is threading.main_thread()))
+        return repo_folder
+
+    with patch.object(Repository, '_clone_remote_repo', clone_remote_repo):
+        # by default, the second repo is cloned in the background, while the
+        # first one is analyzed
+        commits = Repository(list(local_repos)).traverse_commits()
+        assert len([next(commits) for _ in range(5)]) == 5
+        release.set()
+        assert len(list(commits)) == 4
+        assert [in_main_thread for _, in_main_thread in cloned] == [False, False]
+
+        commits = Repository(list(local_repos), repo_workers=1).traverse_commits()
+        assert len(list(commits)) == 9
+        assert [in_main_thread for _, in_main_thread in cloned[2:]] == [True, True]
+
+    for repo_folder, _ in cloned:
+        assert os.path.exists(repo_folder) is False
+
+
+def test_repo_workers_stopped_early():
+    local_repos = {
+        'https://example.com/small_repo.git': 'test-repos/small_repo',
+        'https://example.com/branches_merged.git': 'test-repos/branches_merged',
+        'https://example.com/complex_repo.git': 'test-repos/complex_repo',
+    }
+    cloned = {}
+    release = threading.Event()
+
+    def clone_remote_repo(self, tmp_folder, repo):
+        if repo.endswith('complex_repo.git'):
+            assert release.wait(5)
+        repo_folder = os.path.join(tmp_folder, self._get_repo_name_from_url(repo))
+        shutil.copytree(local_repos[repo], repo_folder)
+        cloned[repo] = repo_folder
+        return repo_folder
+
+    with patch.object(Repository, '_clone_remote_repo', clone_remote_repo):
+        commits = Repository(list(local_repos), repo_workers=3).traverse_commits()
+        next(commits)
+        while len(cloned) < 2:
+            time.sleep(0.01)
+        # the last repo is still being cloned: closing does not wait for it
+        commits.close()
+        assert not release.is_set()
+        release.set()
+
+        # the repos prepared, analyzed or not, are deleted
+        for _ in range(500):
+            if len(cloned) == 3 and not any(os.path.exists(repo_folder) for repo_folder in cloned.values()):
+                break
+            time.sleep(0.01)
+        assert len(cloned) == 3
+        assert not any(os.path.exists(repo_folder) for repo_folder in cloned.values())
+
+
+def test_clone_with_working_tree(tmp_path):
+    url = Path('test-repos/small_repo').resolve().as_uri()
+
+    # Git.files() lists the working tree: the temporary clones are checked out too
+    repo_folder = Repository(url)._clone_remote_repo(str(tmp_path), url)
+    assert 'file2.java' in os.listdir(repo_folder)
+    assert Git(repo_folder).files()
+
+
+def test_clone_with_missing_tag(tmp_path):
+    url = Path('test-repos/tags').resolve().as_uri()
+
+    # the tags are checked on the remote, before cloning
+    with pytest.raises(IndexError, match='tag4'):
+        Repository(url, from_tag='tag1', to_tag='tag4')._clone_remote_repo(str(tmp_path), url)
+    assert not os.listdir(str(tmp_path))
+
+    repo_folder = Repository(url, from_tag='tag1', to_tag='tag3')._clone_remote_repo(str(tmp_path), url)
+    assert Git(repo_folder).get_commit_from_tag('tag3')
+
+
+def test_atraverse_commits():
+    async def hashes(repository):
+        return [commit.hash async for commit in repository.atraverse_commits()]
+
+    repository = Repository('test-repos/small_repo')
+    assert asyncio.run(hashes(repository)) == [commit.hash for commit in repository.traverse_commits()]
+
+
+def test_single_remote_commit(tmp_path, monkeypatch):
+    # let the local remote serve partial clones
+    monkeypatch.setenv('GIT_CONFIG_COUNT', '1')
+    monkeypatch.setenv('GIT_CONFIG_KEY_0', 'uploadpack.allowFilter')
+    monkeypatch.setenv('GIT_CONFIG_VALUE_0', 'true')
+    url = Path('test-repos/small_repo').resolve().as_uri()
+
+    repository = Repository(url, single='09f6182cef737db02a085e1d018963c7a29bde5a')
+    repo_folder = repository._clone_remote_repo(str(tmp_path), url)
+    # the content of the files is downloaded only when needed
+    assert Git(repo_folder).repo.git.config('remote.origin.promisor') == 'true'
+
+    def details(commit):
+        return (commit.hash, commit.branches, commit.in_main_branch,
+                [(m.filename, m.added_lines, m.deleted_lines) for m in commit.modified_files])
+
+    # the temporary folder is deleted after the traversal: diff the commit during it
+    with patch.object(Repository, '_is_remote', staticmethod(lambda repo: True)):
+        commits = [details(commit) for commit in repository.traverse_commits()]
+        # as in a full clone
+        (tmp_path / 'full').mkdir()
+        expected = [details(commit) for commit in Repository(url, single='09f6182cef737db02a085e1d018963c7a29bde5a',
+                                                             clone_repo_to=str(tmp_path / 'full')).traverse_commits()]
+    assert commits == expected
+    assert commits[0][1] == {'master'} and commits[0][2]
+
+
+def test_map_in_window_spreads_short_histories():
+    chunks = []
+
+    def map_chunk(fn, chunk):
+        chunks.append(len(chunk))
+        return [fn(commit) for commit in chunk]
+
+    with patch.object(Repository, '_map_chunk', staticmethod(map_chunk)), \
+            concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        # 9 commits on 8 workers: no worker is left idle
+        assert sorted(Repository._map_in_window(executor, str, range(9), 8, 16)) == [str(i) for i in range(9)]
+        assert chunks == [1] * 9
+
+        chunks.clear()
+        assert len(list(Repository._map_in_window(executor, str, range(1000), 2, 16))) == 1000
+        assert sorted(chunks)[:8] == [1, 1, 2, 2, 4, 4, 8, 8]
+        assert max(chunks) == 16
+
+
+def test_map_in_window_yields_as_completed():
+    release = threading.Event()
+
+    def slow(commit):
+        if commit == 0:
+            release.wait(5)
+        return commit
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        results = Repository._map_in_window(executor, slow, range(100), 2, 16)
+        # the first commit is still computed: the others are not held back
+        assert sorted(next(results) for _ in range(99)) == list(range(1, 100))
+        release.set()
+        assert list(results) == [0]
+
+    # with a single worker, the order is kept
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        assert list(Repository._map_in_window(executor, str, range(100), 1, 16)) == [str(i) for i in range(100)]
+
+
+def test_commits_logged_at_debug_level(caplog):
+    caplog.set_level(logging.INFO, logger='pydriller.repository')
+    list(Repository('test-repos/small_repo').traverse_commits())
+    assert not any(record.message.startswith('Commit #') for record in caplog.records)
+
+    caplog.set_level(logging.DEBUG, logger='pydriller.repository')
+    list(Repository('test-repos/small_repo').traverse_commits())
+    assert sum(record.message.startswith('Commit #') for record in caplog.records) == 5
+
+
+def test_repo_workers_with_filepath():
+    repos = ['test-repos/small_repo', 'test-repos/branches_merged', 'test-repos/small_repo']
+    expected = [commit.hash for commit in Repository(repos, filepath='file4.java').traverse_commits()]
+    assert [commit.hash for commit in Repository(repos, filepath='file4.java', repo_workers=3).traverse_commits()] == expected
+    assert len(expected) == 4
+
+
+def test_diff_algorithm():
+    def diff(**kwargs):
+        commit = next(Repository('test-repos/histogram', single="93df8676e6fab70d9677e94fd0f6b17db095e890",
+                                 **kwargs).traverse_commits())
+        return commit.modified_files[0].diff
+
+    assert diff(diff_algorithm='histogram') == diff(histogram_diff=True)
+    assert diff(diff_algorithm='myers') == diff()
+    assert diff(diff_algorithm='myers', histogram_diff=True) == diff()
+    assert diff(diff_algorithm='histogram') != diff()
+
+    with pytest.raises(Exception):
+        Repository('test-repos/histogram', diff_algorithm='fast')